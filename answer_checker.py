@@ -0,0 +1,171 @@
+"""Local answer checking for the earn questions.
+
+Decides most answers without calling the LLM: exact and numeric matches,
+number words ("восемь" == 8), small typos ("бойкал" == "байкал"), case
+endings ("байкалом" == "байкал") and "I don't know" style non-answers.
+Everything it cannot decide comes back as UNCERTAIN and goes to the LLM.
+"""
+import re
+import threading
+
+CORRECT, INCORRECT, UNCERTAIN = 'correct', 'incorrect', 'uncertain'
+
+# Non-answers, compared after normalize()
+BLOCKLIST = {
+    '', 'не знаю', 'незнаю', 'не понял', 'не поняла', 'непонял', 'не помню',
+    'хз', 'нз', 'хм', 'пофиг', 'без понятия',
+    'не уверен', 'не уверена', 'сдаюсь', 'пропуск', 'пропустить',
+}
+
+UNITS = {
+    'ноль': 0, 'нуль': 0,
+    'один': 1, 'одна': 1, 'одно': 1, 'два': 2, 'две': 2, 'три': 3, 'четыре': 4,
+    'пять': 5, 'шесть': 6, 'семь': 7, 'восемь': 8, 'девять': 9,
+    'десять': 10, 'одиннадцать': 11, 'двенадцать': 12, 'тринадцать': 13,
+    'четырнадцать': 14, 'пятнадцать': 15, 'шестнадцать': 16, 'семнадцать': 17,
+    'восемнадцать': 18, 'девятнадцать': 19,
+}
+TENS = {
+    'двадцать': 20, 'тридцать': 30, 'сорок': 40, 'пятьдесят': 50,
+    'шестьдесят': 60, 'семьдесят': 70, 'восемьдесят': 80, 'девяносто': 90,
+}
+HUNDREDS = {
+    'сто': 100, 'двести': 200, 'триста': 300, 'четыреста': 400, 'пятьсот': 500,
+    'шестьсот': 600, 'семьсот': 700, 'восемьсот': 800, 'девятьсот': 900,
+}
+THOUSANDS = {'тысяча': 1000, 'тысячи': 1000, 'тысяч': 1000}
+NUMBER_WORDS = {**UNITS, **TENS, **HUNDREDS}
+
+# Longest first, so "ами" is tried before "и"
+ENDINGS = sorted([
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'иях', 'ией',
+    'ой', 'ей', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ую', 'юю',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ию', 'ия',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь',
+], key=len, reverse=True)
+
+_NON_WORD = re.compile(r'[^\w\s.,-]+')
+_LOOSE_MARKS = re.compile(r'(?<!\d)[.,]|[.,](?!\d)|-(?!\w)')  # keep "3.5", "-3", "кто-то"
+_SPACES = re.compile(r'\s+')
+_NUMBER = re.compile(r'^-?\d+(?:[.,]\d+)?$')
+
+_stats = {CORRECT: 0, INCORRECT: 0, UNCERTAIN: 0}
+_stats_lock = threading.Lock()
+
+def normalize(text):
+    """Lowercase, ё -> е, drop punctuation and extra spaces"""
+    text = str(text).lower().replace('ё', 'е')
+    text = _NON_WORD.sub(' ', text).replace('_', ' ')
+    text = _LOOSE_MARKS.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+def to_number(text):
+    """Parse a normalized answer written in digits or Russian words, else None"""
+    if _NUMBER.match(text):
+        return float(text.replace(',', '.'))
+
+    words = text.split()
+    if not words:
+        return None
+
+    total = 0
+    current = 0
+    previous = None  # rank of the last word: hundreds 3, tens 2, units 1
+    for word in words:
+        if word in NUMBER_WORDS:
+            # Each word must be a smaller order than the one before it:
+            # "сто двадцать три", but not "пять пять" or "двадцать тридцать"
+            rank = 3 if word in HUNDREDS else 2 if word in TENS else 1
+            if previous is not None and rank >= previous:
+                return None
+            current += NUMBER_WORDS[word]
+            previous = rank
+        elif word in THOUSANDS:
+            total += (current or 1) * 1000
+            current = 0
+            previous = None
+        else:
+            return None
+    return float(total + current)
+
+def stem(word):
+    """Very small Russian stemmer: cut one case ending, keep at least 3 letters"""
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+def levenshtein(a, b, limit):
+    """Edit distance between a and b, or limit + 1 as soon as it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def _typo_limit(word):
+    # Short words are one edit away from other real words ("март" / "марс")
+    if len(word) <= 4:
+        return 0
+    if len(word) <= 6:
+        return 1
+    return 2
+
+def _decide(user_answer, correct_answer):
+    user = normalize(user_answer)
+    correct = normalize(correct_answer)
+
+    if user in BLOCKLIST:
+        return INCORRECT
+    if user == correct:
+        return CORRECT
+
+    correct_number = to_number(correct)
+    user_number = to_number(user)
+    if correct_number is not None:
+        if user_number is not None:
+            return CORRECT if user_number == correct_number else INCORRECT
+        return UNCERTAIN  # e.g. "восемь планет"
+    if user_number is not None:
+        if any(to_number(word) is not None for word in correct.split()):
+            return UNCERTAIN  # e.g. "8" for "восемь планет"
+        return INCORRECT  # a number for a word answer
+
+    user_words = [stem(w) for w in user.split()]
+    correct_words = [stem(w) for w in correct.split()]
+    if user_words == correct_words:
+        return CORRECT
+
+    if len(user_words) == len(correct_words) and all(
+        levenshtein(u, c, _typo_limit(c)) <= _typo_limit(c)
+        for u, c in zip(user_words, correct_words)
+    ):
+        return CORRECT
+
+    # Synonyms, partial answers and longer phrasings are up to the LLM
+    return UNCERTAIN
+
+def check(user_answer, correct_answer):
+    """CORRECT, INCORRECT or UNCERTAIN (= ask the LLM)"""
+    verdict = _decide(user_answer, correct_answer)
+    with _stats_lock:
+        _stats[verdict] += 1
+    return verdict
+
+def stats():
+    """Verdict counters and the share of checks decided without the LLM"""
+    with _stats_lock:
+        counts = dict(_stats)
+    total = sum(counts.values())
+    counts['local_share'] = (counts[CORRECT] + counts[INCORRECT]) / total if total else 0.0
+    return counts
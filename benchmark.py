@@ -0,0 +1,262 @@
+"""Load benchmark: the real bot handlers against a fake Telegram and a fake LLM.
+
+Builds the Application exactly as bot.py does, but with a Bot API transport
+that answers every call locally and records it, a throwaway SQLite file and
+an llm.complete stub that sleeps for --llm-latency seconds. Then thousands
+of simulated users run scripted journeys through Application.process_update:
+
+    registration   /start, name, class, age
+    play           earn (math answered locally, world answer sent to the LLM),
+                   bank deposit, market buy/sell, shop purchase
+
+Every user gets START_WALLET coins between the two phases, so purchases go
+through. Reports updates/sec and DB statements per update for each phase and
+p50/p95/p99 latency per handler callback.
+
+    python benchmark.py --users 2000 --concurrency 200 --llm-latency 0.3
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import tempfile
+import time
+from collections import defaultdict
+
+from telegram import Update
+from telegram.request import BaseRequest
+
+import bot
+import database
+import db
+import db_pool
+import llm
+import metrics
+import verdict_cache
+
+TOKEN = "123456:BENCHMARK"
+FIRST_USER_ID = 10_000_000
+START_WALLET = 5000
+
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "FinQuest", "username": "finquest_bot"}
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+class FakeRequest(BaseRequest):
+    """Bot API transport that never leaves the process and counts every call"""
+
+    read_timeout = None
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls[endpoint] += 1
+
+        if endpoint == 'getMe':
+            result = BOT_USER
+        elif endpoint in ('sendMessage', 'editMessageText'):
+            result = {
+                "message_id": params.get('message_id') or next(_message_ids),
+                "date": int(time.time()),
+                "chat": {"id": params.get('chat_id', 0), "type": "private"},
+                "from": BOT_USER,
+                "text": params.get('text', ''),
+            }
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+async def fake_complete(system, prompt, temperature, max_tokens, timeout=None, purpose='chat', budget=None, latency=0.0):
+    """llm.complete stand-in: a fixed question or verdict after `latency` seconds"""
+    if budget is not None and latency > budget:
+        await asyncio.sleep(budget)
+        raise llm.LLMError(f"LLM latency budget of {budget:.1f}s spent")
+    await asyncio.sleep(latency)
+    if prompt.startswith("Проверь ответ"):
+        text = "ПРАВИЛЬНО\nВ Солнечной системе восемь планет."
+    else:
+        text = "ВОПРОС: Сколько будет 5 + 3?\nОТВЕТ: 8"
+    return llm.Completion(text=text, prompt_tokens=len(prompt) // 4, completion_tokens=len(text) // 4)
+
+def _user(user_id):
+    return {"id": user_id, "is_bot": False, "first_name": "Kid", "username": f"kid{user_id}"}
+
+def message(user_id, text):
+    data = {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": _user(user_id),
+        "text": text,
+    }
+    if text.startswith('/'):
+        data["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": next(_update_ids), "message": data}
+
+def callback(user_id, data):
+    menu = {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": BOT_USER,
+        "text": "menu",
+    }
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "message": menu,
+            "data": data,
+        },
+    }
+
+def registration(user_id):
+    return [
+        message(user_id, '/start'),
+        message(user_id, f'Герой {user_id}'),
+        message(user_id, 'Маг'),
+        message(user_id, str(7 + user_id % 8)),
+    ]
+
+def play(user_id):
+    return [
+        message(user_id, '💰 Фин-Заработок'),
+        message(user_id, '🔢 Математика'),
+        message(user_id, '8'),
+        message(user_id, '💰 Фин-Заработок'),
+        message(user_id, '🌍 Окружающий мир'),
+        message(user_id, 'восемь планет'),
+        message(user_id, '🏦 Сбережения'),
+        message(user_id, '📥 Положить'),
+        message(user_id, '10'),
+        message(user_id, '👛 Кошелек'),
+        message(user_id, '📈 Биржа'),
+        callback(user_id, 'show_buy'),
+        callback(user_id, 'buy_1'),
+        callback(user_id, 'show_sell'),
+        callback(user_id, 'sell_1'),
+        callback(user_id, 'back'),
+        message(user_id, '🛒 Магазин'),
+        callback(user_id, 'buy_capitals'),
+        callback(user_id, 'back'),
+    ]
+
+def instrument(application, timings):
+    """Keep every handler callback's latency samples, for exact percentiles"""
+    for handler in metrics.handlers(application):
+        callback = handler.callback
+
+        async def timed(update, context, callback=callback):
+            start = time.perf_counter()
+            try:
+                return await callback(update, context)
+            finally:
+                timings[callback.__name__].append(time.perf_counter() - start)
+
+        handler.callback = timed
+
+async def run_phase(application, journeys, concurrency, timings):
+    """Feed each user's updates in order, up to `concurrency` users at a time.
+
+    Returns (updates, seconds, statements).
+    """
+    limit = asyncio.Semaphore(concurrency)
+    processor = application.update_processor
+    count = 0
+
+    async def run_user(updates):
+        nonlocal count
+        async with limit:
+            for data in updates:
+                update = Update.de_json(data, application.bot)
+                start = time.perf_counter()
+                await processor.process_update(update, application.process_update(update))
+                timings['(update)'].append(time.perf_counter() - start)
+                count += 1
+
+    statements = db_pool.statement_count()
+    start = time.perf_counter()
+    await asyncio.gather(*(run_user(updates) for updates in journeys))
+    return count, time.perf_counter() - start, db_pool.statement_count() - statements
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def report(phases, timings, calls):
+    print()
+    print(f"{'phase':<14}{'updates':>9}{'seconds':>9}{'upd/s':>9}{'stmts/upd':>11}")
+    for name, (updates, seconds, statements) in phases.items():
+        print(f"{name:<14}{updates:>9}{seconds:>9.2f}{updates / seconds:>9.0f}{statements / updates:>11.1f}")
+
+    print()
+    print(f"{'handler':<24}{'calls':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name in sorted(timings, key=lambda n: -len(timings[n])):
+        values = sorted(timings[name])
+        row = [percentile(values, p) * 1000 for p in (50, 95, 99)]
+        print(f"{name:<24}{len(values):>8}{row[0]:>9.1f}{row[1]:>9.1f}{row[2]:>9.1f}")
+
+    total = sum(updates for updates, _, _ in phases.values())
+    print()
+    print("Bot API calls per update: " + ", ".join(
+        f"{endpoint} {n / total:.2f}" for endpoint, n in sorted(calls.items()) if endpoint != 'getMe'
+    ))
+
+async def main(args):
+    database.DB_NAME = os.path.join(tempfile.mkdtemp(prefix='finquest-bench-'), 'bench.db')
+    database.init_db()
+
+    llm.AI_AVAILABLE = True
+    async def complete(*a, **kw):
+        return await fake_complete(*a, latency=args.llm_latency, **kw)
+    llm.complete = complete
+
+    request = FakeRequest()
+    application = bot.build_application(TOKEN, request=request, flood_limits=args.flood_limits)
+    timings = defaultdict(list)
+    instrument(application, timings)
+
+    user_ids = range(FIRST_USER_ID, FIRST_USER_ID + args.users)
+    phases = {}
+    quiet = contextlib.redirect_stdout(open(os.devnull, 'w')) if not args.verbose else contextlib.nullcontext()
+
+    async with application:
+        await application.start()  # runs the persistence flushes
+        with quiet:
+            phases['registration'] = await run_phase(
+                application, [registration(u) for u in user_ids], args.concurrency, timings)
+            await asyncio.gather(*(db.update_balance(u, START_WALLET) for u in user_ids))
+            phases['play'] = await run_phase(
+                application, [play(u) for u in user_ids], args.concurrency, timings)
+        await application.stop()
+
+    report(phases, timings, request.calls)
+    print(f"DB connections: {db_pool.stats()}")
+    print(f"User cache: {database.user_cache_stats()}")
+    print(f"Verdict cache: {verdict_cache.stats()}")
+    db.shutdown()
+    db_pool.close_all()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=1000, help="simulated users")
+    parser.add_argument('--concurrency', type=int, default=100, help="users active at the same time")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument('--flood-limits', action='store_true', help="keep the outgoing flood limiter on")
+    parser.add_argument('--verbose', action='store_true', help="keep the handlers' print() output")
+    asyncio.run(main(parser.parse_args()))
@@ -1,14 +1,32 @@
 import os
+import asyncio
 import logging
 from dotenv import load_dotenv
 from telegram import Update
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, filters
 
+# Load environment variables (before importing modules that read them)
+load_dotenv()
+
+import answer_checker
 import database
+import db
+import db_pool
+import handlers_bank
+import handlers_earn
+import handlers_market
+import handlers_menu
+import handlers_shop
 import handlers_start
-
-# Load environment variables
-load_dotenv()
+import llm
+import market_engine
+import metrics
+import outbox
+import persistence
+import question_pool
+import update_processor
+import verdict_cache
+import webhook
 
 # Setup logging
 logging.basicConfig(
@@ -16,33 +34,41 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-if __name__ == '__main__':
-    # Initialize Database
-    database.init_db()
-    print("Database initialized.")
+# Long-running tasks started with the bot and cancelled on shutdown
+_background_tasks = []
 
-    token = os.getenv('TELEGRAM_BOT_TOKEN')
-    if not token:
-        print("Error: TELEGRAM_BOT_TOKEN not found in .env file.")
-        exit(1)
+# Polling mode has no HTTP server of its own; set this to expose /metrics
+METRICS_PORT = os.getenv('METRICS_PORT')
+_metrics_server = None
 
-    application = ApplicationBuilder().token(token).build()
-    
-    # Add Handlers
+async def on_startup(application):
+    global _metrics_server
+    if METRICS_PORT:
+        _metrics_server = webhook.start_metrics_server(int(METRICS_PORT))
+        print(f"Metrics on port {METRICS_PORT}")
+    _background_tasks.append(asyncio.create_task(market_engine.tick_loop()))
+    _background_tasks.append(asyncio.create_task(handlers_bank.interest_settlement_loop()))
+    if llm.AI_AVAILABLE:
+        _background_tasks.append(asyncio.create_task(question_pool.refill_loop(handlers_earn.generate_questions)))
+
+async def on_shutdown(application):
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+    await llm.close()
+    if _metrics_server is not None:
+        _metrics_server.stop()
+
+def register_handlers(application):
     application.add_handler(handlers_start.get_conv_handler())
     application.add_handler(CommandHandler('reset', handlers_start.reset))
     
-    import handlers_earn
-    import handlers_bank
-    import handlers_market
-    import handlers_shop
-    
     application.add_handler(handlers_earn.get_earn_conv_handler())
     application.add_handler(handlers_bank.get_bank_conv_handler())
     application.add_handler(handlers_market.get_market_conv_handler())
     
     # Menu Handlers
-    import handlers_menu
     # application.add_handler(MessageHandler(filters.Regex('^💰 Фин-Заработок$'), handlers_menu.placeholder)) # Replaced by conv handler
     application.add_handler(MessageHandler(filters.Regex('^👛 Кошелек$'), handlers_menu.wallet_info))
     # application.add_handler(MessageHandler(filters.Regex('^🏦 Сбережения$'), handlers_menu.placeholder)) # Replaced by conv handler
@@ -50,23 +76,59 @@ if __name__ == '__main__':
     application.add_handler(handlers_shop.get_shop_handler())
     application.add_handler(handlers_shop.get_shop_callback_handler())
     application.add_handler(MessageHandler(filters.Regex('^👤 Герой$'), handlers_menu.hero_info))
-    
-    # ... (handlers setup remains the same)
+
+def build_application(token, request=None, flood_limits=True):
+    """The bot's Application with all handlers; `request` replaces the Bot API transport (see benchmark.py)"""
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .persistence(persistence.SQLitePersistence())
+        .concurrent_updates(update_processor.PerUserUpdateProcessor())
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if flood_limits:
+        builder = builder.rate_limiter(outbox.FloodLimiter())
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    application = builder.build()
+    register_handlers(application)
+    metrics.instrument_handlers(application)
+    return application
+
+if __name__ == '__main__':
+    # Initialize Database
+    database.init_db()
+    print("Database initialized.")
+
+    token = os.getenv('TELEGRAM_BOT_TOKEN')
+    if not token:
+        print("Error: TELEGRAM_BOT_TOKEN not found in .env file.")
+        exit(1)
+
+    application = build_application(token)
 
     # Check if running in Cloud (Render)
     webhook_url = os.getenv('RENDER_EXTERNAL_URL') # Render sets this automatically
     port = int(os.getenv('PORT', '8443'))
 
     if webhook_url:
-        # Webhook Mode (for Render)
+        # Webhook Mode (for Render), with /metrics on the same port
         print(f"Starting Webhook on port {port}...")
-        application.run_webhook(
+        asyncio.run(webhook.serve(
+            application,
             listen="0.0.0.0",
             port=port,
             url_path=token,
             webhook_url=f"{webhook_url}/{token}"
-        )
+        ))
     else:
         # Polling Mode (Local)
         print("Bot is running in POLLING mode...")
         application.run_polling()
+
+    db.shutdown()
+    print(f"DB connections: {db_pool.stats()}")
+    print(f"User cache: {database.user_cache_stats()}")
+    print(f"Answer checks: {answer_checker.stats()}")
+    print(f"Verdict cache: {verdict_cache.stats()}")
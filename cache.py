@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional TTL and hit/miss counters.
+
+    Every invalidation bumps `version` and records it for the key. A reader
+    that loaded a value from the database passes the version it saw before
+    loading to set(), and the value is dropped if that key was invalidated
+    in between, so a slow reader can never put back a row that is already
+    stale, while fills of other keys are unaffected. Only the last maxsize
+    invalidations are remembered; readers older than the ones forgotten are
+    dropped as if their key had been invalidated.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self._invalidated = OrderedDict()  # key -> version of its last invalidation
+        self._floor = 0  # readers older than this are dropped (clear() or forgotten invalidations)
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        """get() without touching the hit/miss counters"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    return value
+                del self._data[key]
+            return default
+
+    def set(self, key, value, version=None):
+        with self._lock:
+            if version is not None and (version < self._floor or self._invalidated.get(key, 0) > version):
+                return
+            expires = time.monotonic() + self.ttl if self.ttl else None
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self.version += 1
+            self._data.pop(key, None)
+            self._invalidated[key] = self.version
+            self._invalidated.move_to_end(key)
+            if len(self._invalidated) > self.maxsize:
+                _, forgotten = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, forgotten)
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._data.clear()
+            self._invalidated.clear()
+            self._floor = self.version
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'hit_rate': self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,94 @@
+"""Circuit breaker for a flaky remote dependency.
+
+Outcomes of the last WINDOW calls are kept with their latency. When at
+least MIN_CALLS are known and too many of them failed or were slow, the
+circuit opens: callers are refused at once and fall back to local code
+instead of waiting out timeouts. After OPEN_SECONDS the circuit goes
+half-open and lets a single probe call through; its success closes the
+circuit, its failure opens it again.
+
+    ticket = breaker.acquire()
+    if ticket is None:
+        ...  # open, use the fallback
+    ok = False
+    try:
+        ...
+        ok = True
+    finally:
+        breaker.record(ticket, ok, latency)
+"""
+import os
+import time
+from collections import deque
+
+import metrics
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+WINDOW = int(os.getenv('BREAKER_WINDOW', '20'))               # recent calls considered
+MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', '5'))
+ERROR_RATE = float(os.getenv('BREAKER_ERROR_RATE', '0.5'))    # failed share that opens
+SLOW_RATE = float(os.getenv('BREAKER_SLOW_RATE', '0.5'))      # slow share that opens
+OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', '30'))
+
+class CircuitBreaker:
+    def __init__(self, name, slow_call, window=WINDOW, min_calls=MIN_CALLS,
+                 error_rate=ERROR_RATE, slow_rate=SLOW_RATE, open_seconds=OPEN_SECONDS):
+        self.name = name
+        self.slow_call = slow_call  # seconds after which a successful call counts as slow
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._calls = deque(maxlen=window)  # (ok, slow)
+        self._opened_at = 0.0
+        self._probing = False
+        metrics.BREAKER_STATE.set(_STATE_VALUES[CLOSED], name)
+
+    def _change(self, state, reason):
+        print(f"Circuit '{self.name}': {self.state} -> {state} ({reason})")
+        self.state = state
+        metrics.BREAKER_STATE.set(_STATE_VALUES[state], self.name)
+        metrics.BREAKER_TRANSITIONS.inc(self.name, state)
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._calls.clear()
+
+    def acquire(self):
+        """The state the call is admitted in, or None if it must use the fallback"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return None
+            self._change(HALF_OPEN, f"probing after {self.open_seconds:.0f}s")
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return None
+            self._probing = True
+        return self.state
+
+    def record(self, ticket, ok, latency):
+        """Report how a call admitted by acquire() went"""
+        if ticket == HALF_OPEN:
+            self._probing = False
+            if self.state != HALF_OPEN:
+                return
+            if ok and latency <= self.slow_call:
+                self._change(CLOSED, f"probe took {latency:.1f}s")
+            else:
+                self._change(OPEN, "probe failed" if not ok else f"probe took {latency:.1f}s")
+            return
+        if ticket != CLOSED or self.state != CLOSED:
+            return  # started before the circuit opened
+
+        self._calls.append((ok, latency > self.slow_call))
+        if len(self._calls) < self.min_calls:
+            return
+        failed = sum(1 for ok, _ in self._calls if not ok) / len(self._calls)
+        slow = sum(1 for ok, slow in self._calls if ok and slow) / len(self._calls)
+        if failed >= self.error_rate:
+            self._change(OPEN, f"{failed:.0%} of the last {len(self._calls)} calls failed")
+        elif slow >= self.slow_rate:
+            self._change(OPEN, f"{slow:.0%} of the last {len(self._calls)} calls were slower than {self.slow_call:.1f}s")
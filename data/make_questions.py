@@ -0,0 +1,486 @@
+"""Build data/questions.tsv, the offline logic and world question bank.
+
+Each line is "subject<TAB>band<TAB>question<TAB>answer", sorted by subject
+and age band so offline_questions can index the file by line ranges.
+Questions come from fact tables and templates below; the output is
+deterministic, rerun after editing:
+
+    python data/make_questions.py
+"""
+import os
+import random
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions.tsv')
+BANDS = ('young', 'middle', 'teen')
+
+rng = random.Random(20240901)
+bank = {}  # (subject, band) -> {question: answer}
+
+def add(subject, bands, question, answer):
+    for band in bands:
+        bank.setdefault((subject, band), {}).setdefault(question, str(answer).lower())
+
+def plural(n, forms):
+    """forms = ('яблоко', 'яблока', 'яблок')"""
+    if n % 10 == 1 and n % 100 != 11:
+        return forms[0]
+    if 2 <= n % 10 <= 4 and not 12 <= n % 100 <= 14:
+        return forms[1]
+    return forms[2]
+
+def count(n, forms):
+    return f"{n} {plural(n, forms)}"
+
+# name, genitive, dative, is_girl
+NAMES = [
+    ('Маша', 'Маши', 'Маше', True), ('Катя', 'Кати', 'Кате', True),
+    ('Аня', 'Ани', 'Ане', True), ('Оля', 'Оли', 'Оле', True),
+    ('Лена', 'Лены', 'Лене', True), ('Таня', 'Тани', 'Тане', True),
+    ('Света', 'Светы', 'Свете', True), ('Даша', 'Даши', 'Даше', True),
+    ('Петя', 'Пети', 'Пете', False), ('Коля', 'Коли', 'Коле', False),
+    ('Дима', 'Димы', 'Диме', False), ('Саша', 'Саши', 'Саше', False),
+    ('Миша', 'Миши', 'Мише', False), ('Вова', 'Вовы', 'Вове', False),
+    ('Ваня', 'Вани', 'Ване', False), ('Серёжа', 'Серёжи', 'Серёже', False),
+]
+
+def verb(name, masculine):
+    """Past tense agreeing with the name: verb(name, 'отдал') -> 'отдала' for girls"""
+    if not name[3]:
+        return masculine
+    return {'нашёл': 'нашла', 'съел': 'съела'}.get(masculine, masculine + 'а')
+
+def pronoun(name):
+    return 'Она' if name[3] else 'Он'
+
+YEARS = ('год', 'года', 'лет')
+RUBLES = ('рубль', 'рубля', 'рублей')
+
+# ---------------------------------------------------------------- logic
+
+COMPARISONS = [
+    # sentence verb, question about the first, question about the last
+    ('выше', 'Кто самый высокий?', 'Кто самый низкий?'),
+    ('старше', 'Кто самый старший?', 'Кто самый младший?'),
+    ('бегает быстрее', 'Кто бегает быстрее всех?', 'Кто бегает медленнее всех?'),
+    ('сильнее', 'Кто самый сильный?', 'Кто самый слабый?'),
+    ('тяжелее', 'Кто самый тяжёлый?', 'Кто самый лёгкий?'),
+]
+
+def comparisons():
+    for _ in range(400):
+        a, b = rng.sample(NAMES, 2)
+        word, first, last = rng.choice(COMPARISONS)
+        question, answer = rng.choice([(first, a), (last, b)])
+        add('logic', ['young'], f"{a[0]} {word} {b[1]}. {question}", answer[0])
+    for _ in range(900):
+        a, b, c = rng.sample(NAMES, 3)
+        word, first, last = rng.choice(COMPARISONS)
+        question, answer = rng.choice([(first, a), (last, c)])
+        add('logic', ['middle'], f"{a[0]} {word} {b[1]}, а {b[0]} {word} {c[1]}. {question}", answer[0])
+    for _ in range(900):
+        people = rng.sample(NAMES, 4)
+        word, first, last = rng.choice(COMPARISONS)
+        facts = [f"{x[0]} {word} {y[1]}" for x, y in zip(people, people[1:])]
+        rng.shuffle(facts)
+        question, answer = rng.choice([(first, people[0]), (last, people[-1])])
+        add('logic', ['teen'], f"{'. '.join(facts)}. {question}", answer[0])
+
+def sequences():
+    ask = "Продолжи ряд: {}, ... Какое число следующее?"
+    for start in range(1, 11):
+        for step in (1, 2, 3):
+            terms = [start + step * i for i in range(5)]
+            add('logic', ['young'], ask.format(', '.join(map(str, terms[:4]))), terms[4])
+        if start >= 5:
+            terms = [start + 10 - i for i in range(5)]
+            add('logic', ['young'], ask.format(', '.join(map(str, terms[:4]))), terms[4])
+    for start in range(1, 51, 3):
+        for step in (2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 15, 20, 25):
+            terms = [start + step * i for i in range(5)]
+            add('logic', ['middle'], ask.format(', '.join(map(str, terms[:4]))), terms[4])
+            terms = [start + step * 4 - step * i for i in range(5)]
+            add('logic', ['middle'], ask.format(', '.join(map(str, terms[:4]))), terms[4])
+    for start in range(1, 8):
+        terms = [start * 2 ** i for i in range(5)]
+        add('logic', ['middle', 'teen'], ask.format(', '.join(map(str, terms[:4]))), terms[4])
+        terms = [start * 3 ** i for i in range(5)]
+        add('logic', ['teen'], ask.format(', '.join(map(str, terms[:4]))), terms[4])
+    for start in range(1, 30):
+        for first_step in range(1, 6):
+            terms = [start]
+            for i in range(4):
+                terms.append(terms[-1] + first_step + i)  # growing differences
+            add('logic', ['teen'], ask.format(', '.join(map(str, terms[:4]))), terms[4])
+    for up in range(3, 12):
+        for down in range(1, up):
+            start = rng.randint(1, 20)
+            terms = [start]
+            for i in range(5):
+                terms.append(terms[-1] + (up if i % 2 == 0 else -down))
+            add('logic', ['teen'], ask.format(', '.join(map(str, terms[:5]))), terms[5])
+    for start in range(1, 12):
+        terms = [(start + i) ** 2 for i in range(5)]
+        add('logic', ['teen'], ask.format(', '.join(map(str, terms[:4]))), terms[4])
+
+CATEGORIES = {
+    'фрукты': ['яблоко', 'груша', 'банан', 'апельсин', 'слива', 'персик', 'абрикос', 'мандарин', 'лимон'],
+    'мебель': ['стол', 'стул', 'шкаф', 'диван', 'кровать', 'кресло', 'табурет', 'комод'],
+    'транспорт': ['автобус', 'трамвай', 'поезд', 'самолёт', 'велосипед', 'троллейбус', 'корабль', 'метро'],
+    'одежда': ['рубашка', 'куртка', 'брюки', 'платье', 'свитер', 'юбка', 'пальто', 'шорты'],
+    'инструменты': ['молоток', 'пила', 'отвёртка', 'топор', 'лопата', 'грабли', 'плоскогубцы', 'рубанок'],
+    'музыка': ['скрипка', 'гитара', 'барабан', 'пианино', 'флейта', 'труба', 'балалайка', 'арфа'],
+    'птицы': ['воробей', 'ворона', 'синица', 'голубь', 'сорока', 'снегирь', 'дятел', 'ласточка'],
+    'цвета': ['красный', 'синий', 'зелёный', 'жёлтый', 'белый', 'чёрный', 'оранжевый', 'фиолетовый'],
+    'посуда': ['тарелка', 'чашка', 'кастрюля', 'сковорода', 'ложка', 'вилка', 'кружка', 'блюдце'],
+    'спорт': ['футбол', 'хоккей', 'теннис', 'баскетбол', 'волейбол', 'бокс', 'плавание', 'биатлон'],
+}
+
+def odd_one_out():
+    names = list(CATEGORIES)
+    for band, size, total in (('young', 3, 500), ('middle', 4, 700), ('teen', 5, 700)):
+        for _ in range(total):
+            main, other = rng.sample(names, 2)
+            words = rng.sample(CATEGORIES[main], size)
+            odd = rng.choice(CATEGORIES[other])
+            words.insert(rng.randint(0, size), odd)
+            add('logic', [band], f"Что лишнее: {', '.join(words)}?", odd)
+
+ITEMS = [
+    ('яблоко', 'яблока', 'яблок'), ('конфета', 'конфеты', 'конфет'),
+    ('карандаш', 'карандаша', 'карандашей'), ('мяч', 'мяча', 'мячей'),
+    ('книга', 'книги', 'книг'), ('марка', 'марки', 'марок'),
+    ('шарик', 'шарика', 'шариков'), ('орех', 'ореха', 'орехов'),
+]
+
+LEGS = [  # (two-legged, four-legged)
+    (('курица', 'курицы', 'кур'), ('кролик', 'кролика', 'кроликов')),
+    (('утка', 'утки', 'уток'), ('кошка', 'кошки', 'кошек')),
+    (('гусь', 'гуся', 'гусей'), ('собака', 'собаки', 'собак')),
+    (('петух', 'петуха', 'петухов'), ('коза', 'козы', 'коз')),
+]
+
+def word_problems():
+    for band, limit, total in (('young', 10, 500), ('middle', 50, 700)):
+        for _ in range(total):
+            who, friend = rng.sample(NAMES, 2)
+            item = rng.choice(ITEMS)
+            n = rng.randint(3, limit)
+            m = rng.randint(1, n - 1)
+            kind = rng.randrange(3)
+            if kind == 0:
+                add('logic', [band], f"У {who[1]} было {count(n, item)}. {pronoun(who)} {verb(who, 'отдал')} "
+                                     f"{count(m, item)} другу. Сколько {item[2]} осталось?", n - m)
+            elif kind == 1:
+                add('logic', [band], f"У {who[1]} {count(n, item)}, а у {friend[1]} на {m} больше. "
+                                     f"Сколько {item[2]} у {friend[1]}?", n + m)
+            else:
+                add('logic', [band], f"{who[0]} {verb(who, 'нашёл')} {count(n, item)}, а потом ещё {m}. "
+                                     f"Сколько {item[2]} всего?", n + m)
+    for _ in range(400):
+        item = rng.choice(ITEMS)
+        kids = rng.randint(2, 6)
+        each = rng.randint(2, 10)
+        add('logic', ['middle'], f"{count(kids * each, item).capitalize()} разделили поровну между {kids} детьми. "
+                                 f"Сколько {item[2]} досталось каждому?", each)
+    for _ in range(600):
+        who = rng.choice(NAMES)
+        pieces = rng.randint(2, 9)
+        price = rng.randint(5, 60)
+        paid = (pieces * price // 100 + 1) * 100
+        add('logic', ['teen'], f"{who[0]} {verb(who, 'купил')} {count(pieces, ('тетрадь', 'тетради', 'тетрадей'))} по {count(price, RUBLES)} "
+                               f"и {verb(who, 'заплатил')} {paid} рублей. Сколько рублей сдачи?", paid - pieces * price)
+    for two, four in LEGS:
+        for n in range(1, 13):
+            for m in range(1, 13):
+                bands = ['young'] if n + m <= 5 else ['middle'] if n + m <= 12 else ['teen']
+                add('logic', bands, f"Во дворе {count(n, two)} и {count(m, four)}. Сколько всего лап?", 2 * n + 4 * m)
+
+def ages():
+    for _ in range(900):
+        a, b = rng.sample(NAMES, 2)
+        n = rng.randint(3, 15)
+        m = rng.randint(1, 6)
+        kind = rng.randrange(4)
+        if kind == 0:
+            add('logic', ['young', 'middle'], f"{a[2]} {count(n, YEARS)}, а {b[0]} на {count(m, YEARS)} старше. "
+                                              f"Сколько лет {b[2]}?", n + m)
+        elif kind == 1 and n > m:
+            add('logic', ['middle'], f"{a[2]} {count(n, YEARS)}, а {b[0]} на {count(m, YEARS)} младше. "
+                                     f"Сколько лет {b[2]}?", n - m)
+        elif kind == 2:
+            add('logic', ['middle', 'teen'], f"Через {count(m, YEARS)} {a[2]} будет {count(n + m, YEARS)}. "
+                                             f"Сколько лет {a[2]} сейчас?", n)
+        else:
+            k = rng.randint(2, 4)
+            add('logic', ['teen'], f"{a[2]} {count(n, YEARS)}, а папа в {k} раза старше. "
+                                   f"Сколько лет папе?", n * k)
+
+DAYS = ['понедельник', 'вторник', 'среда', 'четверг', 'пятница', 'суббота', 'воскресенье']
+DAYS_GEN = ['понедельника', 'вторника', 'среды', 'четверга', 'пятницы', 'субботы', 'воскресенья']
+DAYS_INS = ['понедельником', 'вторником', 'средой', 'четвергом', 'пятницей', 'субботой', 'воскресеньем']
+MONTHS = ['январь', 'февраль', 'март', 'апрель', 'май', 'июнь', 'июль', 'август',
+          'сентябрь', 'октябрь', 'ноябрь', 'декабрь']
+MONTHS_GEN = ['января', 'февраля', 'марта', 'апреля', 'мая', 'июня', 'июля', 'августа',
+              'сентября', 'октября', 'ноября', 'декабря']
+SEASONS = ['зима', 'зима', 'весна', 'весна', 'весна', 'лето', 'лето', 'лето',
+           'осень', 'осень', 'осень', 'зима']
+
+def calendar():
+    for i, day in enumerate(DAYS):
+        add('logic', ['young'], f"Какой день недели идёт после {DAYS_GEN[i]}?", DAYS[(i + 1) % 7])
+        add('logic', ['young'], f"Какой день недели идёт перед {DAYS_INS[i]}?", DAYS[(i - 1) % 7])
+        for n in range(2, 31):
+            bands = ['middle'] if n <= 10 else ['teen']
+            add('logic', bands, f"Сегодня {day}. Какой день недели будет через {count(n, ('день', 'дня', 'дней'))}?",
+                DAYS[(i + n) % 7])
+            if n <= 14:
+                add('logic', ['teen'], f"Сегодня {day}. Какой день недели был {count(n, ('день', 'дня', 'дней'))} назад?",
+                    DAYS[(i - n) % 7])
+    for i, month in enumerate(MONTHS):
+        add('logic', ['young', 'middle'], f"Какой месяц идёт после {MONTHS_GEN[i]}?", MONTHS[(i + 1) % 12])
+        for n in range(2, 25):
+            add('logic', ['teen'], f"Сейчас {month}. Какой месяц будет через {count(n, ('месяц', 'месяца', 'месяцев'))}?",
+                MONTHS[(i + n) % 12])
+
+RIDDLES = [
+    ("Что можно сломать, даже если не трогать?", "обещание"),
+    ("Чем больше из нее берешь, тем больше она становится?", "яма"),
+    ("В комнате горело 5 свечей. 2 погасли. Сколько осталось?", "2"),
+    ("Зимой и летом одним цветом. Что это?", "ёлка"),
+    ("Сидит дед, во сто шуб одет. Кто его раздевает, тот слёзы проливает. Что это?", "лук"),
+    ("Не лает, не кусает, а в дом не пускает. Что это?", "замок"),
+    ("Висит груша — нельзя скушать. Что это?", "лампочка"),
+    ("Без окон, без дверей, полна горница людей. Что это?", "огурец"),
+    ("Сто одёжек и все без застёжек. Что это?", "капуста"),
+    ("Красна девица сидит в темнице, а коса на улице. Что это?", "морковь"),
+    ("Кто ходит утром на четырёх ногах, днём на двух, а вечером на трёх?", "человек"),
+    ("Что идёт, не двигаясь с места?", "время"),
+    ("У кого есть шляпа, но нет головы, есть нога, но нет ботинка?", "гриб"),
+    ("Что становится мокрым, когда сушит?", "полотенце"),
+    ("Что можно увидеть с закрытыми глазами?", "сон"),
+    ("Что принадлежит тебе, но другие пользуются им чаще?", "имя"),
+    ("Сколько месяцев в году имеют 28 дней?", "12"),
+    ("Что тяжелее: килограмм ваты или килограмм железа? Напиши «одинаково», если они равны.", "одинаково"),
+    ("Сколько концов у двух палок?", "4"),
+    ("Сколько концов у двух с половиной палок?", "6"),
+    ("Шли три брата, у каждого по сестре. Сколько всего детей, если сестра одна?", "4"),
+    ("Гусь весит 2 кг на одной ноге. Сколько он весит, стоя на двух ногах?", "2"),
+    ("Тройка лошадей пробежала 30 км. Сколько километров пробежала каждая лошадь?", "30"),
+    ("Бежит, а не ходит, течёт, а не пьёт. Что это?", "река"),
+    ("Не огонь, а жжётся. Что это?", "крапива"),
+    ("Летом серый, зимой белый. Кто это?", "заяц"),
+    ("Хитрая плутовка, рыжая головка. Кто это?", "лиса"),
+    ("Вся в иголках, а не ёлка. Кто это?", "ёж"),
+    ("Кто зимой спит в берлоге?", "медведь"),
+    ("Два кольца, два конца, посередине гвоздик. Что это?", "ножницы"),
+    ("Течёт, течёт — не вытечет, бежит, бежит — не выбежит. Что это?", "река"),
+    ("На рассвете пять утят плыли к берегу. Один нырнул и не вынырнул. Сколько утят на берегу, если второй отстал?", "3"),
+    ("Над рекой летели 3 птицы. Одну подстрелил охотник. Сколько птиц осталось в небе, если остальные улетели?", "0"),
+    ("Что нельзя съесть на завтрак?", "ужин"),
+    ("Чего в комнате нет, если свет выключен?", "света"),
+]
+
+ANTONYMS = [
+    ('большой', 'маленький'), ('высокий', 'низкий'), ('горячий', 'холодный'), ('длинный', 'короткий'),
+    ('день', 'ночь'), ('добрый', 'злой'), ('тяжёлый', 'лёгкий'), ('светлый', 'тёмный'),
+    ('быстрый', 'медленный'), ('весёлый', 'грустный'), ('сильный', 'слабый'), ('старый', 'молодой'),
+    ('широкий', 'узкий'), ('толстый', 'тонкий'), ('чистый', 'грязный'), ('громкий', 'тихий'),
+    ('мокрый', 'сухой'), ('твёрдый', 'мягкий'), ('богатый', 'бедный'), ('смелый', 'трусливый'),
+    ('умный', 'глупый'), ('глубокий', 'мелкий'), ('сладкий', 'горький'), ('ранний', 'поздний'),
+    ('друг', 'враг'), ('правда', 'ложь'), ('радость', 'печаль'), ('начало', 'конец'),
+    ('вход', 'выход'), ('лето', 'зима'), ('утро', 'вечер'), ('верх', 'низ'),
+    ('открывать', 'закрывать'), ('приходить', 'уходить'), ('покупать', 'продавать'), ('плакать', 'смеяться'),
+    ('найти', 'потерять'), ('начинать', 'заканчивать'), ('поднимать', 'опускать'), ('включать', 'выключать'),
+    ('далеко', 'близко'), ('много', 'мало'), ('рано', 'поздно'), ('быстро', 'медленно'),
+    ('вверх', 'вниз'), ('вперёд', 'назад'), ('часто', 'редко'), ('громко', 'тихо'),
+]
+
+def antonyms():
+    for a, b in ANTONYMS:
+        add('logic', ['young', 'middle'], f"Назови слово с противоположным значением: «{a}».", b)
+        add('logic', ['middle', 'teen'], f"Какое слово противоположно по смыслу слову «{b}»?", a)
+
+# ---------------------------------------------------------------- world
+
+YOUNG = [
+    ('корова', 'коровы', 'телёнок'), ('лошадь', 'лошади', 'жеребёнок'), ('собака', 'собаки', 'щенок'),
+    ('кошка', 'кошки', 'котёнок'), ('овца', 'овцы', 'ягнёнок'), ('свинья', 'свиньи', 'поросёнок'),
+    ('коза', 'козы', 'козлёнок'), ('курица', 'курицы', 'цыплёнок'), ('утка', 'утки', 'утёнок'),
+    ('медведь', 'медведя', 'медвежонок'), ('волк', 'волка', 'волчонок'), ('лиса', 'лисы', 'лисёнок'),
+    ('заяц', 'зайца', 'зайчонок'), ('ёж', 'ежа', 'ежонок'), ('гусь', 'гуся', 'гусёнок'),
+    ('лев', 'льва', 'львёнок'), ('тигр', 'тигра', 'тигрёнок'), ('слон', 'слона', 'слонёнок'),
+    ('белка', 'белки', 'бельчонок'), ('верблюд', 'верблюда', 'верблюжонок'),
+]
+
+COUNTRIES = [
+    # country, capital, continent
+    ('Россия', 'Москва', 'Евразия'), ('Франция', 'Париж', 'Евразия'), ('Германия', 'Берлин', 'Евразия'),
+    ('Италия', 'Рим', 'Евразия'), ('Испания', 'Мадрид', 'Евразия'), ('Великобритания', 'Лондон', 'Евразия'),
+    ('Япония', 'Токио', 'Евразия'), ('Китай', 'Пекин', 'Евразия'), ('Египет', 'Каир', 'Африка'),
+    ('Греция', 'Афины', 'Евразия'), ('Португалия', 'Лиссабон', 'Евразия'), ('Польша', 'Варшава', 'Евразия'),
+    ('Чехия', 'Прага', 'Евразия'), ('Австрия', 'Вена', 'Евразия'), ('Венгрия', 'Будапешт', 'Евразия'),
+    ('Норвегия', 'Осло', 'Евразия'), ('Швеция', 'Стокгольм', 'Евразия'), ('Финляндия', 'Хельсинки', 'Евразия'),
+    ('Дания', 'Копенгаген', 'Евразия'), ('Нидерланды', 'Амстердам', 'Евразия'), ('Бельгия', 'Брюссель', 'Евразия'),
+    ('Швейцария', 'Берн', 'Евразия'), ('Турция', 'Анкара', 'Евразия'), ('Индия', 'Нью-Дели', 'Евразия'),
+    ('Канада', 'Оттава', 'Северная Америка'), ('Мексика', 'Мехико', 'Северная Америка'),
+    ('Куба', 'Гавана', 'Северная Америка'), ('Бразилия', 'Бразилиа', 'Южная Америка'),
+    ('Аргентина', 'Буэнос-Айрес', 'Южная Америка'), ('Перу', 'Лима', 'Южная Америка'),
+    ('Чили', 'Сантьяго', 'Южная Америка'), ('Австралия', 'Канберра', 'Австралия'),
+    ('Казахстан', 'Астана', 'Евразия'), ('Беларусь', 'Минск', 'Евразия'), ('Армения', 'Ереван', 'Евразия'),
+    ('Грузия', 'Тбилиси', 'Евразия'), ('Азербайджан', 'Баку', 'Евразия'), ('Узбекистан', 'Ташкент', 'Евразия'),
+    ('Киргизия', 'Бишкек', 'Евразия'), ('Таджикистан', 'Душанбе', 'Евразия'), ('Монголия', 'Улан-Батор', 'Евразия'),
+    ('Вьетнам', 'Ханой', 'Евразия'), ('Таиланд', 'Бангкок', 'Евразия'), ('Иран', 'Тегеран', 'Евразия'),
+    ('Кения', 'Найроби', 'Африка'), ('Ирландия', 'Дублин', 'Евразия'), ('Исландия', 'Рейкьявик', 'Евразия'),
+    ('Латвия', 'Рига', 'Евразия'), ('Литва', 'Вильнюс', 'Евразия'), ('Эстония', 'Таллин', 'Евразия'),
+    ('Сербия', 'Белград', 'Евразия'), ('Болгария', 'София', 'Евразия'), ('Румыния', 'Бухарест', 'Евразия'),
+    ('Южная Корея', 'Сеул', 'Евразия'), ('Марокко', 'Рабат', 'Африка'), ('Нигерия', 'Абуджа', 'Африка'),
+]
+FAMOUS = {'Россия', 'Франция', 'Германия', 'Италия', 'Великобритания', 'Япония', 'Китай', 'Египет', 'Беларусь'}
+
+UNITS = [
+    # in one ..., in several ..., small unit (genitive plural), factor, first n
+    ('часе', 'часах', 'минут', 60, 1), ('минуте', 'минутах', 'секунд', 60, 1),
+    ('сутках', 'сутках', 'часов', 24, 2), ('неделе', 'неделях', 'дней', 7, 1),
+    ('году', 'годах', 'месяцев', 12, 2), ('веке', 'веках', 'лет', 100, 1),
+    ('метре', 'метрах', 'сантиметров', 100, 1), ('дециметре', 'дециметрах', 'сантиметров', 10, 1),
+    ('сантиметре', 'сантиметрах', 'миллиметров', 10, 1), ('километре', 'километрах', 'метров', 1000, 1),
+    ('килограмме', 'килограммах', 'граммов', 1000, 1), ('тонне', 'тоннах', 'килограммов', 1000, 1),
+    ('рубле', 'рублях', 'копеек', 100, 1), ('литре', 'литрах', 'миллилитров', 1000, 1),
+]
+
+def units():
+    for one, several, small, factor, first in UNITS:
+        for band, last in (('young', 5), ('middle', 20), ('teen', 60)):
+            if band == 'young' and factor > 10:
+                continue
+            for n in range(first, last + 1):
+                where = one if n % 10 == 1 and n % 100 != 11 else several
+                add('world', [band], f"Сколько {small} в {n} {where}?", n * factor)
+
+ANIMAL_CLASSES = {
+    'птица': ['воробей', 'ворона', 'сова', 'орёл', 'голубь', 'синица', 'дятел', 'ласточка', 'пингвин',
+              'страус', 'аист', 'лебедь', 'попугай', 'сорока', 'снегирь', 'журавль', 'чайка', 'цапля'],
+    'рыба': ['щука', 'карп', 'окунь', 'сом', 'акула', 'лосось', 'карась', 'треска', 'сельдь',
+             'камбала', 'форель', 'судак', 'ёрш'],
+    'насекомое': ['муравей', 'пчела', 'бабочка', 'комар', 'муха', 'жук', 'стрекоза', 'кузнечик',
+                  'оса', 'шмель', 'божья коровка', 'таракан'],
+    'зверь': ['волк', 'лиса', 'медведь', 'заяц', 'белка', 'ёж', 'лось', 'тигр', 'лев', 'слон',
+              'жираф', 'бобр', 'барсук', 'рысь', 'олень', 'енот', 'кенгуру', 'зебра'],
+}
+
+DIETS = {
+    'хищник': ['волк', 'тигр', 'лев', 'лиса', 'рысь', 'орёл', 'сова', 'акула', 'щука', 'леопард',
+               'гепард', 'крокодил', 'ястреб', 'песец'],
+    'травоядное': ['корова', 'лошадь', 'заяц', 'олень', 'лось', 'жираф', 'слон', 'коза', 'овца',
+                   'кролик', 'зебра', 'бегемот', 'носорог', 'бобр', 'верблюд'],
+}
+
+FACTS = [
+    (['young', 'middle'], "Сколько дней в неделе?", "7"),
+    (['young', 'middle'], "Сколько месяцев в году?", "12"),
+    (['young', 'middle'], "Сколько часов в сутках?", "24"),
+    (['young', 'middle'], "Сколько времён года?", "4"),
+    (['young', 'middle'], "Сколько ног у паука?", "8"),
+    (['young', 'middle'], "Сколько ног у насекомого?", "6"),
+    (['young', 'middle'], "Какого цвета снег?", "белый"),
+    (['young', 'middle'], "Какого цвета трава летом?", "зелёный"),
+    (['young', 'middle'], "Какая птица не умеет летать и живёт в Антарктиде?", "пингвин"),
+    (['young', 'middle'], "Какое самое большое животное на Земле?", "кит"),
+    (['young', 'middle'], "Какое животное называют кораблём пустыни?", "верблюд"),
+    (['young', 'middle'], "Кто плетёт паутину?", "паук"),
+    (['young', 'middle'], "Кто даёт нам мёд?", "пчела"),
+    (['young', 'middle'], "Какое самое высокое животное?", "жираф"),
+    (['young', 'middle'], "Как называется замёрзшая вода?", "лёд"),
+    (['young', 'middle', 'teen'], "Какой спутник у Земли?", "луна"),
+    (['young', 'middle', 'teen'], "Какая звезда ближе всего к Земле?", "солнце"),
+    (['middle', 'teen'], "Сколько планет в Солнечной системе?", "8"),
+    (['middle', 'teen'], "Какая планета самая большая в Солнечной системе?", "юпитер"),
+    (['middle', 'teen'], "Какая планета ближе всего к Солнцу?", "меркурий"),
+    (['middle', 'teen'], "Какую планету называют красной?", "марс"),
+    (['middle', 'teen'], "У какой планеты самые заметные кольца?", "сатурн"),
+    (['middle', 'teen'], "Какая планета третья от Солнца?", "земля"),
+    (['middle', 'teen'], "Самое глубокое озеро в мире?", "байкал"),
+    (['middle', 'teen'], "Какой океан самый большой?", "тихий"),
+    (['middle', 'teen'], "Какой материк самый большой?", "евразия"),
+    (['middle', 'teen'], "Какой материк самый холодный?", "антарктида"),
+    (['middle', 'teen'], "Как называется самая большая пустыня Африки?", "сахара"),
+    (['middle', 'teen'], "Какая река самая длинная в Европе?", "волга"),
+    (['middle', 'teen'], "Какая гора самая высокая в мире?", "эверест"),
+    (['middle', 'teen'], "Какой газ мы выдыхаем?", "углекислый"),
+    (['middle', 'teen'], "Какой газ нужен нам для дыхания?", "кислород"),
+    (['middle', 'teen'], "При скольких градусах замерзает вода?", "0"),
+    (['middle', 'teen'], "При скольких градусах кипит вода?", "100"),
+    (['middle', 'teen'], "Сколько дней в високосном году?", "366"),
+    (['middle', 'teen'], "Сколько континентов на Земле?", "6"),
+    (['middle', 'teen'], "Сколько океанов на Земле?", "5"),
+    (['middle', 'teen'], "Какой орган качает кровь по телу?", "сердце"),
+    (['middle', 'teen'], "Сколько зубов у взрослого человека?", "32"),
+    (['teen'], "Сколько костей в теле взрослого человека?", "206"),
+    (['teen'], "Как называется наука о растениях?", "ботаника"),
+    (['teen'], "Как называется наука о животных?", "зоология"),
+    (['teen'], "Какой металл жидкий при комнатной температуре?", "ртуть"),
+    (['teen'], "Кто написал «Евгения Онегина»?", "пушкин"),
+    (['teen'], "Кто написал «Войну и мир»?", "толстой"),
+    (['teen'], "Кто создал периодическую таблицу элементов?", "менделеев"),
+    (['teen'], "Кто первым полетел в космос?", "гагарин"),
+    (['teen'], "В каком году человек впервые полетел в космос?", "1961"),
+    (['teen'], "Как называется самый большой остров на Земле?", "гренландия"),
+    (['teen'], "Какое море самое солёное?", "мёртвое"),
+    (['teen'], "Какая самая длинная река в мире?", "нил"),
+]
+
+RIVERS = [
+    ('Москва', 'Москва'), ('Санкт-Петербург', 'Нева'), ('Нижний Новгород', 'Волга'), ('Казань', 'Волга'),
+    ('Самара', 'Волга'), ('Волгоград', 'Волга'), ('Ростов-на-Дону', 'Дон'), ('Новосибирск', 'Обь'),
+    ('Красноярск', 'Енисей'), ('Омск', 'Иртыш'), ('Якутск', 'Лена'), ('Хабаровск', 'Амур'),
+    ('Пермь', 'Кама'), ('Ярославль', 'Волга'), ('Париж', 'Сена'), ('Лондон', 'Темза'),
+    ('Рим', 'Тибр'), ('Каир', 'Нил'), ('Будапешт', 'Дунай'), ('Вена', 'Дунай'), ('Киев', 'Днепр'),
+]
+
+def world():
+    for name, gen, baby in YOUNG:
+        add('world', ['young', 'middle'], f"Как называется детёныш {gen}?", baby)
+    for country, capital, continent in COUNTRIES:
+        bands = ['young', 'middle', 'teen'] if country in FAMOUS else ['middle', 'teen']
+        add('world', bands, f"Назови столицу страны: {country}.", capital)
+        add('world', ['teen'], f"{capital} — столица какой страны?", country)
+        add('world', ['middle', 'teen'], f"На каком материке находится страна {country}?", continent)
+    for kind, animals in ANIMAL_CLASSES.items():
+        for animal in animals:
+            add('world', ['young', 'middle'], f"{animal.capitalize()} — это птица, рыба, насекомое или зверь?", kind)
+    for diet, animals in DIETS.items():
+        for animal in animals:
+            add('world', ['young', 'middle', 'teen'], f"{animal.capitalize()} — хищник или травоядное?", diet)
+    for i, month in enumerate(MONTHS):
+        add('world', ['young', 'middle'], f"Какое время года, когда на календаре {month}?", SEASONS[i])
+        add('world', ['middle', 'teen'], f"Какой по счёту месяц {month}?", i + 1)
+    for city, river in RIVERS:
+        add('world', ['teen'], f"На какой реке стоит город {city}?", river)
+    for bands, question, answer in FACTS:
+        add('world', bands, question, answer)
+    units()
+
+def main():
+    comparisons()
+    sequences()
+    odd_one_out()
+    word_problems()
+    ages()
+    calendar()
+    antonyms()
+    for question, answer in RIDDLES:
+        add('logic', BANDS, question, answer)
+    world()
+
+    lines = []
+    for (subject, band), questions in sorted(bank.items(), key=lambda kv: (kv[0][0], BANDS.index(kv[0][1]))):
+        for question, answer in sorted(questions.items()):
+            assert '\t' not in question + answer and '\n' not in question + answer
+            lines.append(f"{subject}\t{band}\t{question}\t{answer}\n")
+        print(f"{subject:6} {band:7} {len(questions)}")
+    with open(PATH, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    print(f"{len(lines)} questions written to {PATH}")
+
+if __name__ == '__main__':
+    main()
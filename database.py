@@ -1,12 +1,70 @@
 import sqlite3
 import datetime
+import functools
+import os
+from collections import namedtuple
+
+import db_pool
+import interest
+from cache import LRUCache
 
 DB_NAME = "finquest.db"
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
+# A users row. namedtuples have no per-instance __dict__, so they cost no
+# more than the plain tuple but can be read by field name.
+User = namedtuple('User', [
+    'id', 'telegram_id', 'username', 'character_name', 'character_class',
+    'level', 'wallet_balance', 'savings_balance', 'savings_start_date', 'age',
+])
+_USER_COLUMNS = ', '.join(User._fields)
+
+Balances = namedtuple('Balances', ['wallet', 'savings', 'savings_start_date'])
+
+# Outcome of buy_item / sell_item / buy_game; wallet is the balance after the
+# operation (or the current one when it was refused)
+TradeResult = namedtuple('TradeResult', ['status', 'name', 'price', 'wallet'])
+OK, NOT_FOUND, NO_FUNDS, NOT_OWNED, ALREADY_OWNED = 'ok', 'not_found', 'no_funds', 'not_owned', 'already_owned'
+
+# Recently read user rows by telegram_id; every write below invalidates its user
+_user_cache = LRUCache(
+    maxsize=int(os.getenv('USER_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '30')),
+)
+
+def _writes_user(func):
+    """Drop the user's cached row once a write to it has finished"""
+    @functools.wraps(func)
+    def wrapper(telegram_id, *args, **kwargs):
+        try:
+            return func(telegram_id, *args, **kwargs)
+        finally:
+            _user_cache.pop(telegram_id)
+    return wrapper
+
+db_pool.register_function('accrued_interest', 3, interest.sql_accrued)
+db_pool.register_function('settled_since', 3, interest.sql_settled_since)
+
+# Pays accrued interest and moves the settlement time (both use the old row values)
+_SETTLE_SQL = '''
+    UPDATE users SET
+        savings_balance = savings_balance + accrued_interest(savings_balance, savings_start_date, :now),
+        savings_start_date = settled_since(savings_balance, savings_start_date, :now)
+'''
+
+def user_cache_stats():
+    return _user_cache.stats()
+
+def get_connection():
+    """This thread's pooled connection to DB_NAME"""
+    return db_pool.get_connection(DB_NAME)
+
+def _add_column(cursor, table, column, decl):
+    columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+def _migration_1_base_schema(cursor):
+    """Tables as they were before versioning; IF NOT EXISTS so old databases pass through"""
     # Users Table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -22,12 +80,9 @@ def init_db():
             age INTEGER DEFAULT 10
         )
     ''')
-    
-    # Simple migration for existing databases
-    try:
-        cursor.execute('ALTER TABLE users ADD COLUMN age INTEGER DEFAULT 10')
-    except sqlite3.OperationalError:
-        pass # Column likely already exists
+
+    # Databases created before the age column
+    _add_column(cursor, 'users', 'age', 'INTEGER DEFAULT 10')
 
     # Market Items Table
     cursor.execute('''
@@ -36,7 +91,18 @@ def init_db():
             name TEXT NOT NULL,
             description TEXT,
             current_price INTEGER NOT NULL,
-            price_history TEXT -- JSON string or comma separated values
+            price_history TEXT, -- unused, see the price_history table
+            base_price INTEGER
+        )
+    ''')
+
+    _add_column(cursor, 'market_items', 'base_price', 'INTEGER')
+
+    # Last market tick written by market_engine.py (single row)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS market_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            tick INTEGER NOT NULL
         )
     ''')
 
@@ -64,6 +130,29 @@ def init_db():
         )
     ''')
 
+    # Append-only price per market tick; the primary key doubles as the
+    # covering index for "last N points" and tick-range reads of an item
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS price_history (
+            item_id INTEGER NOT NULL,
+            tick INTEGER NOT NULL,
+            price INTEGER NOT NULL,
+            PRIMARY KEY (item_id, tick)
+        ) WITHOUT ROWID
+    ''')
+
+    # Pre-generated AI questions waiting to be served (see question_pool.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS question_pool (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject TEXT NOT NULL,
+            age_band TEXT NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_question_pool_key ON question_pool (subject, age_band, id)')
+
     # Seed initial market items if empty
     cursor.execute('SELECT count(*) FROM market_items')
     if cursor.fetchone()[0] == 0:
@@ -75,98 +164,466 @@ def init_db():
         ]
         cursor.executemany('INSERT INTO market_items (name, description, current_price) VALUES (?, ?, ?)', initial_items)
 
-    conn.commit()
-    conn.close()
+    # Prices wander around their base price
+    cursor.execute('UPDATE market_items SET base_price = current_price WHERE base_price IS NULL')
+
+def _migration_2_indexes(cursor):
+    """Unique (user_id, item_id) on inventory and an index on market item names.
+
+    purchased_games(user_id) needs no new index: its UNIQUE(user_id, game_id)
+    index already serves lookups by user_id.
+    """
+    # Merge duplicate inventory rows left by the old check-then-insert code
+    cursor.execute('''
+        UPDATE inventory SET quantity = (
+            SELECT SUM(quantity) FROM inventory AS dup
+            WHERE dup.user_id = inventory.user_id AND dup.item_id = inventory.item_id
+        )
+        WHERE id IN (SELECT MIN(id) FROM inventory GROUP BY user_id, item_id HAVING COUNT(*) > 1)
+    ''')
+    cursor.execute('DELETE FROM inventory WHERE id NOT IN (SELECT MIN(id) FROM inventory GROUP BY user_id, item_id)')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_inventory_user_item ON inventory (user_id, item_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_market_items_name ON market_items (name)')
+
+def _migration_3_persistence(cursor):
+    """Tables for persistence.SQLitePersistence (user_data and conversation states as JSON)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS persist_user_data (
+            user_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS persist_conversations (
+            name TEXT NOT NULL,
+            key TEXT NOT NULL,
+            state TEXT NOT NULL,
+            PRIMARY KEY (name, key)
+        ) WITHOUT ROWID
+    ''')
+
+def _migration_4_verdict_cache(cursor):
+    """LLM answer verdicts (see verdict_cache.py), keyed by a digest of the normalized texts"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS verdict_cache (
+            key BLOB PRIMARY KEY,
+            is_correct INTEGER NOT NULL,
+            explanation TEXT NOT NULL,
+            tokens INTEGER NOT NULL,
+            created REAL NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_verdict_cache_created ON verdict_cache (created)')
+
+def _migration_5_seen_questions(cursor):
+    """Questions each user has already been asked (see seen_questions.py)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS seen_questions (
+            user_id INTEGER PRIMARY KEY,
+            bank_size INTEGER NOT NULL,
+            bank BLOB NOT NULL,
+            bloom BLOB NOT NULL,
+            bloom_count INTEGER NOT NULL
+        )
+    ''')
+
+# Applied in order; the schema version stored in PRAGMA user_version is the
+# number of migrations already applied. Only ever append to this list.
+MIGRATIONS = [
+    _migration_1_base_schema,
+    _migration_2_indexes,
+    _migration_3_persistence,
+    _migration_4_verdict_cache,
+    _migration_5_seen_questions,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def init_db():
+    """Bring the schema up to SCHEMA_VERSION; no DDL at all when it's already current"""
+    conn = get_connection()
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with db_pool.transaction(conn):
+            migration(conn.cursor())
+            conn.execute(f'PRAGMA user_version = {number}')
+        print(f"Database schema migrated to version {number}")
 
+@_writes_user
 def add_user(telegram_id, username, character_name, character_class, age):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    conn = get_connection()
     try:
-        cursor.execute('''
+        conn.execute('''
             INSERT INTO users (telegram_id, username, character_name, character_class, age)
             VALUES (?, ?, ?, ?, ?)
         ''', (telegram_id, username, character_name, character_class, age))
-        conn.commit()
         return True
     except sqlite3.IntegrityError:
         return False
-    finally:
-        conn.close()
 
 def get_user(telegram_id):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM users WHERE telegram_id = ?', (telegram_id,))
-    user = cursor.fetchone()
-    conn.close()
+    user = _user_cache.get(telegram_id)
+    if user is not None:
+        return user
+
+    version = _user_cache.version
+    conn = get_connection()
+    row = conn.execute(f'SELECT {_USER_COLUMNS} FROM users WHERE telegram_id = ?', (telegram_id,)).fetchone()
+    if row is None:
+        return None
+    user = User._make(row)
+    _user_cache.set(telegram_id, user, version=version)
     return user
 
+# Projected reads: served from the row get_user cached when there is one,
+# otherwise only the needed columns are fetched. They don't fill the cache or
+# count in its stats, so its hit rate describes get_user alone.
+
+def get_wallet(telegram_id):
+    user = _user_cache.peek(telegram_id)
+    if user is not None:
+        return user.wallet_balance
+    row = get_connection().execute('SELECT wallet_balance FROM users WHERE telegram_id = ?', (telegram_id,)).fetchone()
+    return row[0] if row else None
+
+def get_balances(telegram_id):
+    user = _user_cache.peek(telegram_id)
+    if user is not None:
+        return Balances(user.wallet_balance, user.savings_balance, user.savings_start_date)
+    row = get_connection().execute('SELECT wallet_balance, savings_balance, savings_start_date FROM users WHERE telegram_id = ?',
+                                   (telegram_id,)).fetchone()
+    return Balances._make(row) if row else None
+
+def get_age(telegram_id):
+    user = _user_cache.peek(telegram_id)
+    if user is not None:
+        return user.age
+    row = get_connection().execute('SELECT age FROM users WHERE telegram_id = ?', (telegram_id,)).fetchone()
+    return row[0] if row else None
+
+@_writes_user
 def update_balance(telegram_id, amount, is_savings=False):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    conn = get_connection()
     field = "savings_balance" if is_savings else "wallet_balance"
-    cursor.execute(f'UPDATE users SET {field} = {field} + ? WHERE telegram_id = ?', (amount, telegram_id))
-    conn.commit()
-    conn.commit()
-    conn.close()
+    conn.execute(f'UPDATE users SET {field} = {field} + ? WHERE telegram_id = ?', (amount, telegram_id))
 
+@_writes_user
 def delete_user(telegram_id):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM users WHERE telegram_id = ?', (telegram_id,))
-    cursor.execute('DELETE FROM inventory WHERE user_id = (SELECT id FROM users WHERE telegram_id = ?)', (telegram_id,))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        # Inventory first: its subquery needs the users row
+        conn.execute('DELETE FROM inventory WHERE user_id = (SELECT id FROM users WHERE telegram_id = ?)', (telegram_id,))
+        conn.execute('DELETE FROM users WHERE telegram_id = ?', (telegram_id,))
+
+# One indexed upsert on the unique (user_id, item_id) index
+_ADD_TO_INVENTORY_SQL = '''
+    INSERT INTO inventory (user_id, item_id, quantity) VALUES (?, ?, ?)
+    ON CONFLICT (user_id, item_id) DO UPDATE SET quantity = quantity + excluded.quantity
+'''
 
 def add_to_inventory(user_id, item_id, quantity=1):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    # Check if item already exists in inventory
-    cursor.execute('SELECT quantity FROM inventory WHERE user_id = ? AND item_id = ?', (user_id, item_id))
-    result = cursor.fetchone()
-    
-    if result:
-        new_quantity = result[0] + quantity
-        cursor.execute('UPDATE inventory SET quantity = ? WHERE user_id = ? AND item_id = ?', (new_quantity, user_id, item_id))
-    else:
-        cursor.execute('INSERT INTO inventory (user_id, item_id, quantity) VALUES (?, ?, ?)', (user_id, item_id, quantity))
-        
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    conn.execute(_ADD_TO_INVENTORY_SQL, (user_id, item_id, quantity))
 
 def get_inventory(user_id):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
+    conn = get_connection()
+    cursor = conn.execute('''
         SELECT m.name, m.description, i.quantity 
         FROM inventory i
         JOIN market_items m ON i.item_id = m.id
         WHERE i.user_id = ?
     ''', (user_id,))
-    items = cursor.fetchall()
-    conn.close()
-    return items
+    return cursor.fetchall()
+
+def get_sell_listing(telegram_id):
+    """[(item_id, name, quantity, current_price), ...] the user can sell, in one query"""
+    conn = get_connection()
+    return conn.execute('''
+        SELECT m.id, m.name, i.quantity, m.current_price
+        FROM users u
+        JOIN inventory i ON i.user_id = u.id
+        JOIN market_items m ON m.id = i.item_id
+        WHERE u.telegram_id = ? AND i.quantity > 0
+        ORDER BY m.id
+    ''', (telegram_id,)).fetchall()
 
 def purchase_game(user_id, game_id):
     """Purchase a game for a user"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    conn = get_connection()
     try:
-        cursor.execute('INSERT INTO purchased_games (user_id, game_id, purchase_date) VALUES (?, ?, ?)',
-                      (user_id, game_id, datetime.datetime.now().isoformat()))
-        conn.commit()
+        conn.execute('INSERT INTO purchased_games (user_id, game_id, purchase_date) VALUES (?, ?, ?)',
+                     (user_id, game_id, datetime.datetime.now().isoformat()))
         return True
     except sqlite3.IntegrityError:
         return False  # Already purchased
-    finally:
-        conn.close()
 
 def get_purchased_games(user_id):
     """Get list of game IDs that user has purchased"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('SELECT game_id FROM purchased_games WHERE user_id = ?', (user_id,))
-    games = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return games
+    conn = get_connection()
+    cursor = conn.execute('SELECT game_id FROM purchased_games WHERE user_id = ?', (user_id,))
+    return [row[0] for row in cursor.fetchall()]
+
+def pool_push(subject, age_band, questions):
+    """Store a batch of (question, answer) pairs in the question pool"""
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        conn.executemany('INSERT INTO question_pool (subject, age_band, question, answer) VALUES (?, ?, ?, ?)',
+                         [(subject, age_band, q, a) for q, a in questions])
+
+def pool_pop(subject, age_band):
+    """Take the oldest pooled (question, answer) for this key, or None if the pool is empty"""
+    conn = get_connection()
+    return conn.execute('''
+        DELETE FROM question_pool
+        WHERE id = (SELECT id FROM question_pool WHERE subject = ? AND age_band = ? ORDER BY id LIMIT 1)
+        RETURNING question, answer
+    ''', (subject, age_band)).fetchone()
+
+def pool_questions(subject, age_band):
+    """Texts of the questions pooled for this key"""
+    conn = get_connection()
+    rows = conn.execute('SELECT question FROM question_pool WHERE subject = ? AND age_band = ?', (subject, age_band)).fetchall()
+    return [row[0] for row in rows]
+
+def pool_counts():
+    """{(subject, age_band): number of pooled questions}"""
+    conn = get_connection()
+    rows = conn.execute('SELECT subject, age_band, count(*) FROM question_pool GROUP BY subject, age_band').fetchall()
+    return {(subject, band): count for subject, band, count in rows}
+
+def persisted_user_data():
+    """[(user_id, JSON text), ...] saved by persist()"""
+    conn = get_connection()
+    return conn.execute('SELECT user_id, data FROM persist_user_data').fetchall()
+
+def persisted_conversations(name):
+    """[(key JSON, state JSON), ...] of one conversation handler"""
+    conn = get_connection()
+    return conn.execute('SELECT key, state FROM persist_conversations WHERE name = ?', (name,)).fetchall()
+
+def persist(user_rows, conversation_rows):
+    """Save buffered state in one transaction.
+
+    user_rows are (user_id, JSON or None), conversation_rows are
+    (name, key JSON, state JSON or None); None deletes the row.
+    """
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        conn.executemany('''
+            INSERT INTO persist_user_data (user_id, data) VALUES (?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET data = excluded.data
+        ''', [row for row in user_rows if row[1] is not None])
+        conn.executemany('DELETE FROM persist_user_data WHERE user_id = ?',
+                         [(user_id,) for user_id, data in user_rows if data is None])
+        conn.executemany('''
+            INSERT INTO persist_conversations (name, key, state) VALUES (?, ?, ?)
+            ON CONFLICT (name, key) DO UPDATE SET state = excluded.state
+        ''', [row for row in conversation_rows if row[2] is not None])
+        conn.executemany('DELETE FROM persist_conversations WHERE name = ? AND key = ?',
+                         [(name, key) for name, key, state in conversation_rows if state is None])
+
+def verdict_get(key, min_created):
+    """(is_correct, explanation, tokens) stored after min_created (unix time), or None"""
+    conn = get_connection()
+    return conn.execute(
+        'SELECT is_correct, explanation, tokens FROM verdict_cache WHERE key = ? AND created >= ?',
+        (key, min_created)
+    ).fetchone()
+
+def verdict_put(key, is_correct, explanation, tokens, created):
+    conn = get_connection()
+    conn.execute('''
+        INSERT INTO verdict_cache (key, is_correct, explanation, tokens, created) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (key) DO UPDATE SET
+            is_correct = excluded.is_correct, explanation = excluded.explanation,
+            tokens = excluded.tokens, created = excluded.created
+    ''', (key, is_correct, explanation, tokens, created))
+
+def verdict_prune(min_created, max_rows):
+    """Drop expired verdicts, then the oldest ones beyond max_rows; returns rows deleted"""
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        expired = conn.execute('DELETE FROM verdict_cache WHERE created < ?', (min_created,)).rowcount
+        overflow = conn.execute('''
+            DELETE FROM verdict_cache WHERE created <= (
+                SELECT created FROM verdict_cache ORDER BY created DESC LIMIT 1 OFFSET ?
+            )
+        ''', (max_rows,)).rowcount
+    return expired + overflow
+
+def seen_get(user_id):
+    """(bank_size, bank, bloom, bloom_count) for a user, or None"""
+    conn = get_connection()
+    return conn.execute(
+        'SELECT bank_size, bank, bloom, bloom_count FROM seen_questions WHERE user_id = ?', (user_id,)
+    ).fetchone()
+
+def seen_put(user_id, bank_size, bank, bloom, bloom_count):
+    conn = get_connection()
+    conn.execute('''
+        INSERT INTO seen_questions (user_id, bank_size, bank, bloom, bloom_count) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET
+            bank_size = excluded.bank_size, bank = excluded.bank,
+            bloom = excluded.bloom, bloom_count = excluded.bloom_count
+    ''', (user_id, bank_size, bank, bloom, bloom_count))
+
+def get_market_state():
+    """(last saved tick or None, [(id, name, description, current_price, base_price), ...])"""
+    conn = get_connection()
+    row = conn.execute('SELECT tick FROM market_state WHERE id = 1').fetchone()
+    items = conn.execute('SELECT id, name, description, current_price, base_price FROM market_items ORDER BY id').fetchall()
+    return (row[0] if row else None), items
+
+def save_market_tick(tick, prices, retention):
+    """Write one tick's prices [(item_id, price), ...] and their history in a single transaction.
+
+    History older than retention ticks is dropped in the same transaction.
+    """
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        conn.executemany('UPDATE market_items SET current_price = ? WHERE id = ?',
+                         [(price, item_id) for item_id, price in prices])
+        conn.execute('INSERT INTO market_state (id, tick) VALUES (1, ?) ON CONFLICT(id) DO UPDATE SET tick = excluded.tick', (tick,))
+        conn.executemany('INSERT OR REPLACE INTO price_history (item_id, tick, price) VALUES (?, ?, ?)',
+                         [(item_id, tick, price) for item_id, price in prices])
+        conn.executemany('DELETE FROM price_history WHERE item_id = ? AND tick <= ?',
+                         [(item_id, tick - retention) for item_id, _ in prices])
+
+def get_price_history(item_id, limit):
+    """Last limit (tick, price) points of an item, oldest first"""
+    conn = get_connection()
+    rows = conn.execute('SELECT tick, price FROM price_history WHERE item_id = ? ORDER BY tick DESC LIMIT ?',
+                        (item_id, limit)).fetchall()
+    rows.reverse()
+    return rows
+
+def get_price_history_range(item_id, start_tick, end_tick):
+    """(tick, price) points of an item with start_tick <= tick <= end_tick, oldest first"""
+    conn = get_connection()
+    return conn.execute('SELECT tick, price FROM price_history WHERE item_id = ? AND tick BETWEEN ? AND ? ORDER BY tick',
+                        (item_id, start_tick, end_tick)).fetchall()
+
+def _wallet(conn, telegram_id):
+    row = conn.execute('SELECT wallet_balance FROM users WHERE telegram_id = ?', (telegram_id,)).fetchone()
+    return row[0] if row else 0
+
+def _debit(conn, telegram_id, amount):
+    """Take amount from the wallet if it's there. (user_id, new wallet) or None."""
+    return conn.execute('''
+        UPDATE users SET wallet_balance = wallet_balance - ?
+        WHERE telegram_id = ? AND wallet_balance >= ?
+        RETURNING id, wallet_balance
+    ''', (amount, telegram_id, amount)).fetchone()
+
+@_writes_user
+def buy_item(telegram_id, item_id):
+    """Pay the current market price and add one item to the inventory, atomically"""
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        item = conn.execute('SELECT name, current_price FROM market_items WHERE id = ?', (item_id,)).fetchone()
+        if not item:
+            return TradeResult(NOT_FOUND, None, 0, None)
+        name, price = item
+
+        debited = _debit(conn, telegram_id, price)
+        if not debited:
+            return TradeResult(NO_FUNDS, name, price, _wallet(conn, telegram_id))
+        user_id, wallet = debited
+
+        conn.execute(_ADD_TO_INVENTORY_SQL, (user_id, item_id, 1))
+        return TradeResult(OK, name, price, wallet)
+
+@_writes_user
+def sell_item(telegram_id, item_id, ratio):
+    """Sell one item for ratio * current market price, atomically"""
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        item = conn.execute('SELECT name, current_price FROM market_items WHERE id = ?', (item_id,)).fetchone()
+        if not item:
+            return TradeResult(NOT_FOUND, None, 0, None)
+        name, market_price = item
+        price = int(market_price * ratio)
+
+        taken = conn.execute('''
+            UPDATE inventory SET quantity = quantity - 1
+            WHERE user_id = (SELECT id FROM users WHERE telegram_id = ?) AND item_id = ? AND quantity > 0
+            RETURNING user_id, quantity
+        ''', (telegram_id, item_id)).fetchone()
+        if not taken:
+            return TradeResult(NOT_OWNED, name, price, _wallet(conn, telegram_id))
+        user_id, left = taken
+        if left == 0:
+            conn.execute('DELETE FROM inventory WHERE user_id = ? AND item_id = ?', (user_id, item_id))
+
+        wallet = conn.execute('UPDATE users SET wallet_balance = wallet_balance + ? WHERE id = ? RETURNING wallet_balance',
+                              (price, user_id)).fetchone()[0]
+        return TradeResult(OK, name, price, wallet)
+
+@_writes_user
+def buy_game(telegram_id, game_id, price):
+    """Pay for a shop game and record the purchase, atomically"""
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        owned = conn.execute('''
+            SELECT 1 FROM purchased_games
+            WHERE user_id = (SELECT id FROM users WHERE telegram_id = ?) AND game_id = ?
+        ''', (telegram_id, game_id)).fetchone()
+        if owned:
+            return TradeResult(ALREADY_OWNED, game_id, price, _wallet(conn, telegram_id))
+
+        debited = _debit(conn, telegram_id, price)
+        if not debited:
+            return TradeResult(NO_FUNDS, game_id, price, _wallet(conn, telegram_id))
+        user_id, wallet = debited
+
+        conn.execute('INSERT INTO purchased_games (user_id, game_id, purchase_date) VALUES (?, ?, ?)',
+                     (user_id, game_id, datetime.datetime.now().isoformat()))
+        return TradeResult(OK, game_id, price, wallet)
+
+def _settle_user(conn, telegram_id):
+    """Pay one user's interest so far, so the balance change starts a fresh period"""
+    conn.execute(_SETTLE_SQL + ' WHERE telegram_id = :telegram_id',
+                 {'now': datetime.datetime.now().isoformat(), 'telegram_id': telegram_id})
+
+def settle_interest():
+    """Pay accrued interest to every saver in one statement. Returns the number of users paid."""
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        cursor = conn.execute(_SETTLE_SQL + ' WHERE savings_balance > 0',
+                              {'now': datetime.datetime.now().isoformat()})
+    _user_cache.clear()
+    return cursor.rowcount
+
+@_writes_user
+def deposit(telegram_id, amount):
+    """Move amount from wallet to savings. (ok, wallet, savings) after the attempt."""
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        _settle_user(conn, telegram_id)
+        row = conn.execute('''
+            UPDATE users SET wallet_balance = wallet_balance - ?, savings_balance = savings_balance + ?
+            WHERE telegram_id = ? AND wallet_balance >= ?
+            RETURNING wallet_balance, savings_balance
+        ''', (amount, amount, telegram_id, amount)).fetchone()
+        if row:
+            return True, row[0], row[1]
+        row = conn.execute('SELECT wallet_balance, savings_balance FROM users WHERE telegram_id = ?', (telegram_id,)).fetchone()
+        return False, row[0], row[1]
+
+@_writes_user
+def withdraw(telegram_id, amount):
+    """Move amount from savings to wallet. (ok, wallet, savings) after the attempt."""
+    conn = get_connection()
+    with db_pool.transaction(conn):
+        _settle_user(conn, telegram_id)
+        row = conn.execute('''
+            UPDATE users SET wallet_balance = wallet_balance + ?, savings_balance = savings_balance - ?
+            WHERE telegram_id = ? AND savings_balance >= ?
+            RETURNING wallet_balance, savings_balance
+        ''', (amount, amount, telegram_id, amount)).fetchone()
+        if row:
+            return True, row[0], row[1]
+        row = conn.execute('SELECT wallet_balance, savings_balance FROM users WHERE telegram_id = ?', (telegram_id,)).fetchone()
+        return False, row[0], row[1]
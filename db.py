@@ -0,0 +1,87 @@
+"""Async facade over database.py.
+
+Every call runs on a small dedicated thread pool, so SQLite I/O (and its
+fsyncs) never blocks the bot's event loop. Each worker thread keeps its own
+pooled connection (see db_pool).
+
+    user = await db.get_user(telegram_id)
+"""
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import db_pool
+import metrics
+# Re-exported so handlers only need to import db
+from database import User, Balances, TradeResult, OK, NOT_FOUND, NO_FUNDS, NOT_OWNED, ALREADY_OWNED
+
+# SQLite allows a single writer at a time; a few threads are enough to keep
+# readers flowing while one of them waits on a commit.
+DB_WORKERS = int(os.getenv('DB_WORKERS', '4'))
+
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='db')
+
+def _measured(func):
+    """Record duration and statement count of func in metrics (runs on the worker thread)"""
+    name = func.__name__
+
+    def call(*args, **kwargs):
+        statements = db_pool.thread_statement_count()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.DB_SECONDS.observe(time.perf_counter() - start, name)
+            metrics.DB_STATEMENTS.inc(name, amount=db_pool.thread_statement_count() - statements)
+    return call
+
+def _offload(func):
+    measured = _measured(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(measured, *args, **kwargs))
+    return wrapper
+
+def shutdown():
+    _executor.shutdown(wait=True)
+
+init_db = _offload(database.init_db)
+add_user = _offload(database.add_user)
+get_user = _offload(database.get_user)
+get_wallet = _offload(database.get_wallet)
+get_balances = _offload(database.get_balances)
+get_age = _offload(database.get_age)
+update_balance = _offload(database.update_balance)
+delete_user = _offload(database.delete_user)
+add_to_inventory = _offload(database.add_to_inventory)
+get_inventory = _offload(database.get_inventory)
+get_sell_listing = _offload(database.get_sell_listing)
+purchase_game = _offload(database.purchase_game)
+get_purchased_games = _offload(database.get_purchased_games)
+pool_push = _offload(database.pool_push)
+pool_pop = _offload(database.pool_pop)
+pool_questions = _offload(database.pool_questions)
+pool_counts = _offload(database.pool_counts)
+persisted_user_data = _offload(database.persisted_user_data)
+persisted_conversations = _offload(database.persisted_conversations)
+persist = _offload(database.persist)
+verdict_get = _offload(database.verdict_get)
+verdict_put = _offload(database.verdict_put)
+verdict_prune = _offload(database.verdict_prune)
+seen_get = _offload(database.seen_get)
+seen_put = _offload(database.seen_put)
+get_market_state = _offload(database.get_market_state)
+save_market_tick = _offload(database.save_market_tick)
+get_price_history = _offload(database.get_price_history)
+get_price_history_range = _offload(database.get_price_history_range)
+buy_item = _offload(database.buy_item)
+sell_item = _offload(database.sell_item)
+buy_game = _offload(database.buy_game)
+deposit = _offload(database.deposit)
+withdraw = _offload(database.withdraw)
+settle_interest = _offload(database.settle_interest)
@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Pragmas applied once to every new connection
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",   # safe with WAL, one fsync per checkpoint instead of per commit
+    "PRAGMA cache_size=-8000",     # ~8 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Size of sqlite3's per-connection prepared statement cache
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_lock = threading.Lock()
+_all_connections = []
+_stats = {'opened': 0, 'reused': 0}
+_generation = 0  # bumped by close_all() so threads drop their stale handles
+_functions = []  # (name, nargs, func) installed on every new connection
+_statement_counters = []  # one [n] per connection, bumped only by its own thread
+
+def _connect(db_name):
+    # isolation_level=None: we issue BEGIN/COMMIT ourselves (see transaction())
+    # check_same_thread=False only so close_all() may close it from another
+    # thread; in normal use a connection never leaves the thread that opened it.
+    conn = sqlite3.connect(
+        db_name,
+        isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    for name, nargs, func in _functions:
+        conn.create_function(name, nargs, func, deterministic=True)
+
+    counter = [0]
+    def count_statement(_sql):
+        counter[0] += 1
+    conn.set_trace_callback(count_statement)
+    return conn, counter
+
+def register_function(name, nargs, func):
+    """Make a Python function callable from SQL on every pooled connection.
+
+    Call at import time, before the first connection is opened.
+    """
+    _functions.append((name, nargs, func))
+
+def get_connection(db_name):
+    """Return this thread's long-lived connection to db_name, opening it on first use"""
+    conns = getattr(_local, 'conns', None)
+    if conns is None or _local.generation != _generation:
+        conns = _local.conns = {}
+        _local.counters = []
+        _local.generation = _generation
+
+    conn = conns.get(db_name)
+    if conn is not None:
+        with _lock:
+            _stats['reused'] += 1
+        return conn
+
+    conn, counter = _connect(db_name)
+    conns[db_name] = conn
+    _local.counters.append(counter)
+    with _lock:
+        _stats['opened'] += 1
+        _all_connections.append(conn)
+        _statement_counters.append(counter)
+    return conn
+
+@contextmanager
+def transaction(conn, mode="IMMEDIATE"):
+    """Run a block in one transaction: commit on success, roll back on error.
+
+    IMMEDIATE takes the write lock up front, so two writers never deadlock
+    trying to upgrade a read lock.
+    """
+    conn.execute(f"BEGIN {mode}")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+
+def statement_count():
+    """SQL statements executed on all pooled connections so far (BEGIN/COMMIT included)"""
+    with _lock:
+        return sum(counter[0] for counter in _statement_counters)
+
+def thread_statement_count():
+    """SQL statements executed by the calling thread's connections so far"""
+    return sum(counter[0] for counter in getattr(_local, 'counters', ()))
+
+def stats():
+    """Connection reuse counters, e.g. {'opened': 2, 'reused': 1530, 'statements': 4210}"""
+    with _lock:
+        result = dict(_stats)
+    result['statements'] = statement_count()
+    return result
+
+def close_all():
+    """Close every pooled connection (on shutdown or when switching DB files)"""
+    global _generation
+    with _lock:
+        conns = list(_all_connections)
+        _all_connections.clear()
+        _generation += 1
+    for conn in conns:
+        conn.close()
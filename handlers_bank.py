@@ -1,21 +1,31 @@
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
-import database
+import asyncio
+import os
+import db
 import handlers_menu
+import interest
 
 # States
 CHOOSING_ACTION, ENTERING_AMOUNT = range(2)
 
+# How often accrued interest is paid out to everyone
+INTEREST_SETTLE_SECONDS = int(os.getenv('INTEREST_SETTLE_SECONDS', str(interest.SECONDS_PER_DAY)))
+
+def savings_with_interest(balances):
+    """Savings including interest accrued since the last settlement"""
+    return balances.savings + interest.accrued(balances.savings, balances.savings_start_date)
+
 async def bank_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = database.get_user(update.effective_user.id)
-    wallet = user[6]
-    savings = user[7]
+    balances = await db.get_balances(update.effective_user.id)
+    wallet = balances.wallet
+    savings = savings_with_interest(balances)
     
     text = (
         f"🏦 **Касса Сбережений**\n\n"
         f"💳 В кошельке: {wallet} монет\n"
         f"🔒 В сбережениях: {savings} монет\n\n"
-        f"📈 Ставка: 5% в день\n"
+        f"📈 Ставка: {interest.DAILY_RATE:.0%} в день\n"
         f"Что хочешь сделать?"
     )
     
@@ -26,6 +36,7 @@ async def bank_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown',
         reply_markup=ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
     )
+    handlers_menu.remember_keyboard(update.effective_chat.id, 'bank')
     return CHOOSING_ACTION
 
 async def handle_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -42,9 +53,9 @@ async def handle_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['bank_action'] = 'deposit' if action == '📥 Положить' else 'withdraw'
     
     # Get current balance for "All" button
-    user = database.get_user(update.effective_user.id)
-    wallet = user[6]
-    savings = user[7]
+    balances = await db.get_balances(update.effective_user.id)
+    wallet = balances.wallet
+    savings = savings_with_interest(balances)
     
     # Create quick buttons with "All" option
     if action == '📥 Положить':
@@ -67,6 +78,7 @@ async def handle_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text=text,
         reply_markup=ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
     )
+    handlers_menu.remember_keyboard(update.effective_chat.id, 'bank_amount')
     return ENTERING_AMOUNT
 
 async def handle_amount(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -75,9 +87,9 @@ async def handle_amount(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await handlers_menu.show_main_menu(update, context)
         return ConversationHandler.END
     
-    user = database.get_user(update.effective_user.id)
-    wallet = user[6]
-    savings = user[7]
+    balances = await db.get_balances(update.effective_user.id)
+    wallet = balances.wallet
+    savings = savings_with_interest(balances)
     action = context.user_data['bank_action']
     
     # Handle "All" button
@@ -93,31 +105,38 @@ async def handle_amount(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await context.bot.send_message(chat_id=update.effective_chat.id, text="Пожалуйста, введи положительное число или выбери кнопку.")
             return ENTERING_AMOUNT
     
-    # Validate and process
+    # Validate and process: one transaction that only moves coins that are there
     if action == 'deposit':
-        if amount > wallet:
+        ok, wallet, savings = await db.deposit(update.effective_user.id, amount)
+        if not ok:
             await context.bot.send_message(chat_id=update.effective_chat.id, text=f"❌ Недостаточно средств в кошельке!\n💳 У тебя: {wallet} монет\n💸 Нужно: {amount} монет")
             return ENTERING_AMOUNT
-        
-        database.update_balance(update.effective_user.id, -amount, is_savings=False)
-        database.update_balance(update.effective_user.id, amount, is_savings=True)
         msg = f"✅ Успешно!\n📥 Положено в сбережения: {amount} монет"
         
     else:  # withdraw
-        if amount > savings:
+        ok, wallet, savings = await db.withdraw(update.effective_user.id, amount)
+        if not ok:
             await context.bot.send_message(chat_id=update.effective_chat.id, text=f"❌ Недостаточно средств в сбережениях!\n🔒 У тебя: {savings} монет\n💸 Нужно: {amount} монет")
             return ENTERING_AMOUNT
-            
-        database.update_balance(update.effective_user.id, amount, is_savings=False)
-        database.update_balance(update.effective_user.id, -amount, is_savings=True)
         msg = f"✅ Успешно!\n📤 Снято со счета: {amount} монет"
 
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=msg)
-    await handlers_menu.show_main_menu(update, context)
+    await handlers_menu.show_main_menu(update, context, text=msg)
     return ConversationHandler.END
 
+async def interest_settlement_loop():
+    """Background task: pay accrued interest to all savers every INTEREST_SETTLE_SECONDS"""
+    while True:
+        await asyncio.sleep(INTEREST_SETTLE_SECONDS)
+        try:
+            paid = await db.settle_interest()
+            print(f"Interest settled for {paid} savers")
+        except Exception as e:
+            print(f"Interest settlement error: {e}")
+
 def get_bank_conv_handler():
     return ConversationHandler(
+        name='bank',
+        persistent=True,
         entry_points=[MessageHandler(filters.Regex('^🏦 Сбережения$'), bank_menu)],
         states={
             CHOOSING_ACTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_action)],
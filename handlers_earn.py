@@ -1,28 +1,26 @@
+import json
 import random
-import os
+import re
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
-import database
+import answer_checker
+import db
 import handlers_menu
-
-# Try to import OpenAI for Groq
-try:
-    from openai import OpenAI
-    client = OpenAI(
-        api_key=os.getenv('GROQ_API_KEY'),
-        base_url="https://api.groq.com/openai/v1"
-    )
-    AI_AVAILABLE = True
-except:
-    AI_AVAILABLE = False
-    print("AI not available, using simple answer checking")
+import llm
+import offline_questions
+import question_pool
+import seen_questions
+import verdict_cache
 
 # States
 CHOOSING_SUBJECT, ANSWERING_PROBLEM = range(2)
 
+_LATIN = re.compile(r'[A-Za-z]')
+_SIMPLE_SUM = re.compile(r'^\D*?(\d+)\s*([-+*/×÷:])\s*(\d+)\D*$')
+
 async def generate_question(subject_type, age):
     """Generate question using AI"""
-    if not AI_AVAILABLE:
+    if not llm.AI_AVAILABLE:
         print("AI not available for question generation")
         return None, None
     
@@ -80,17 +78,16 @@ async def generate_question(subject_type, age):
     }
     
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "Создаёшь вопросы на ЧИСТОМ русском языке. ЗАПРЕЩЕНЫ английские буквы/слова. Грамматика важна. 2 строки."},
-                {"role": "user", "content": prompts[subject_type]}
-            ],
+        response = await llm.complete(
+            system="Создаёшь вопросы на ЧИСТОМ русском языке. ЗАПРЕЩЕНЫ английские буквы/слова. Грамматика важна. 2 строки.",
+            prompt=prompts[subject_type],
             temperature=0.6,
-            max_tokens=80
+            max_tokens=80,
+            purpose='question',
+            budget=llm.INTERACTIVE_BUDGET
         )
         
-        result = response.choices[0].message.content.strip()
+        result = response.text
         print(f"AI response: {result}")
         
         # Parse with fallback
@@ -115,6 +112,89 @@ async def generate_question(subject_type, age):
         print(f"Question generation error: {e}")
         return None, None
 
+BATCH_PROMPTS = {
+    'math': ("математических примеров", "ответ — только число", '[{"q": "Сколько будет 5 + 3?", "a": "8"}, {"q": "12 - 4 = ?", "a": "8"}]'),
+    'logic': ("простых загадок", "ответ — одно слово", '[{"q": "Что можно сломать, даже не трогая?", "a": "обещание"}, {"q": "Чем больше из неё берёшь, тем больше она становится?", "a": "яма"}]'),
+    'world': ("простых вопросов о мире", "ответ — одно-два слова", '[{"q": "Какой спутник у Земли?", "a": "Луна"}, {"q": "Самое глубокое озеро в мире?", "a": "Байкал"}]'),
+}
+
+def validate_question(subject_type, question, answer):
+    """Cleaned (question, answer) from a generated item, or None if it breaks the rules"""
+    if not isinstance(question, str) or not isinstance(answer, (str, int, float)):
+        return None
+    question, answer = question.strip(), str(answer).strip().lower()
+    if not question or not answer or len(question) > 200 or len(answer) > 40:
+        return None
+    if _LATIN.search(question) or _LATIN.search(answer):
+        return None
+
+    if subject_type == 'math':
+        value = answer_checker.to_number(answer_checker.normalize(answer))
+        if value is None:
+            return None
+        # "a op b" questions are checked, the model gets arithmetic wrong
+        match = _SIMPLE_SUM.match(question)
+        if match:
+            a, op, b = int(match.group(1)), match.group(2), int(match.group(3))
+            if op == '+': expected = a + b
+            elif op == '-': expected = a - b
+            elif op in '*×': expected = a * b
+            else: expected = a / b if b else None
+            if expected != value:
+                return None
+    return question, answer
+
+async def generate_questions(subject_type, age, count=question_pool.BATCH_SIZE):
+    """Generate up to `count` questions with one AI call; returns the valid [(question, answer), ...]"""
+    if not llm.AI_AVAILABLE:
+        return []
+    
+    kind, answer_rule, example = BATCH_PROMPTS[subject_type]
+    prompt = f"""Создай {count} разных {kind} для ребенка {age} лет.
+
+ПРАВИЛА:
+- ТОЛЬКО русские слова (0% английских!)
+- Грамматически верно
+- {answer_rule}
+
+ФОРМАТ: только JSON-массив из {count} объектов, без пояснений:
+{example}"""
+    
+    try:
+        response = await llm.complete(
+            system="Создаёшь вопросы на ЧИСТОМ русском языке. ЗАПРЕЩЕНЫ английские буквы/слова. Грамматика важна. Отвечаешь только JSON.",
+            prompt=prompt,
+            temperature=0.7,
+            max_tokens=50 * count,
+            purpose='question_batch'
+        )
+    except Exception as e:
+        print(f"Question batch error: {e}")
+        return []
+    
+    # The array may come wrapped in a code fence or a sentence
+    text = response.text
+    try:
+        items = json.loads(text[text.index('['):text.rindex(']') + 1])
+    except ValueError:
+        print(f"❌ Failed to parse question batch: {text[:200]}")
+        return []
+    if not isinstance(items, list):
+        return []
+    
+    questions = []
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        valid = validate_question(subject_type, item.get('q'), item.get('a'))
+        if valid and valid[0] not in seen:
+            seen.add(valid[0])
+            questions.append(valid)
+    
+    print(f"✅ Generated {len(questions)}/{len(items)} {subject_type} questions for age {age}")
+    return questions
+
 async def start_earning(update: Update, context: ContextTypes.DEFAULT_TYPE):
     keyboard = [['🔢 Математика', '🧩 Логика'], ['🌍 Окружающий мир', '🔙 Назад']]
     await context.bot.send_message(
@@ -122,8 +202,35 @@ async def start_earning(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text="Выберите предмет для заработка:",
         reply_markup=ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
     )
+    handlers_menu.remember_keyboard(update.effective_chat.id, 'subjects')
     return CHOOSING_SUBJECT
 
+# Menu button -> (subject, min reward, max reward)
+SUBJECTS = {
+    '🔢 Математика': ('math', 15, 30),
+    '🧩 Логика': ('logic', 20, 40),
+    '🌍 Окружающий мир': ('world', 10, 20),
+}
+POOL_TRIES = 3  # pooled questions skipped as already seen before giving up on the pool
+
+async def pick_question(subject_type, age, seen):
+    """A question this user hasn't had: pooled AI question, live AI, then the offline engine"""
+    # Try pre-generated AI questions first, live AI generation on a pool miss
+    for _ in range(POOL_TRIES):
+        q, a = await question_pool.take(subject_type, age)
+        if not q or not seen.has(q):
+            break
+    if not q or seen.has(q):
+        q, a = await generate_question(subject_type, age)
+    if q and a and not seen.has(q):
+        seen.add(q)
+        return q, a
+    
+    # Offline fallback
+    if subject_type == 'math':
+        return offline_questions.math_question(age, seen)
+    return offline_questions.sample(subject_type, age, seen)
+
 async def choose_subject(update: Update, context: ContextTypes.DEFAULT_TYPE):
     subject = update.message.text
     
@@ -131,67 +238,18 @@ async def choose_subject(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await handlers_menu.show_main_menu(update, context)
         return ConversationHandler.END
         
-    user = database.get_user(update.effective_user.id)
-    age = user[9] if user and len(user) > 9 else 10
-    
-    # Try AI generation first
-    q, a = None, None
-    
-    if subject == '🔢 Математика':
-        q, a = await generate_question('math', age)
-        reward = random.randint(15, 30)
-        
-        # Fallback to hardcoded
-        if not q or not a:
-            if age < 8:
-                n1, n2 = random.randint(1, 10), random.randint(1, 10)
-                op = random.choice(['+', '-'])
-                if op == '-' and n1 < n2: n1, n2 = n2, n1
-            elif age < 12:
-                n1, n2 = random.randint(10, 50), random.randint(2, 10)
-                op = random.choice(['+', '-', '*'])
-            else:
-                n1, n2 = random.randint(20, 100), random.randint(5, 20)
-                op = random.choice(['+', '-', '*', '/'])
-                if op == '/': n1 = n1 * n2
-                
-            if op == '+': ans = n1 + n2
-            elif op == '-': ans = n1 - n2
-            elif op == '*': ans = n1 * n2
-            elif op == '/': ans = n1 // n2
-            
-            q = f"{n1} {op} {n2} = ?"
-            a = str(ans)
-        
-    elif subject == '🧩 Логика':
-        q, a = await generate_question('logic', age)
-        reward = random.randint(20, 40)
-        
-        # Fallback
-        if not q or not a:
-            puzzles = [
-                ("Что можно сломать, даже если не трогать?", "обещание"),
-                ("Чем больше из нее берешь, тем больше она становится?", "яма"),
-                ("В комнате горело 5 свечей. 2 погасли. Сколько осталось?", "2"),
-            ]
-            q, a = random.choice(puzzles)
-
-    elif subject == '🌍 Окружающий мир':
-        q, a = await generate_question('world', age)
-        reward = random.randint(10, 20)
-        
-        # Fallback
-        if not q or not a:
-            questions = [
-                ("Сколько планет в Солнечной системе?", "8"),
-                ("Самое глубокое озеро в мире?", "байкал"),
-                ("Какой газ мы выдыхаем?", "углекислый"),
-            ]
-            q, a = random.choice(questions)
-        
-    else:
+    if subject not in SUBJECTS:
         await context.bot.send_message(chat_id=update.effective_chat.id, text="Выберите предмет из меню.")
         return CHOOSING_SUBJECT
+    
+    subject_type, min_reward, max_reward = SUBJECTS[subject]
+    user_id = update.effective_user.id
+    age = await db.get_age(user_id) or 10
+    seen = await seen_questions.load(user_id)
+    
+    q, a = await pick_question(subject_type, age, seen)
+    reward = random.randint(min_reward, max_reward)
+    await seen_questions.save(user_id, seen)
 
     context.user_data['ans'] = a
     context.user_data['reward'] = reward
@@ -202,18 +260,12 @@ async def choose_subject(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text=f"❓ {q}\n\n(Награда: {reward} монет)",
         reply_markup=ReplyKeyboardRemove()
     )
+    handlers_menu.remember_keyboard(update.effective_chat.id, None)
     return ANSWERING_PROBLEM
 
-async def check_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user_ans = update.message.text.strip()
-    correct_ans = str(context.user_data.get('ans'))
-    reward = context.user_data.get('reward')
-    question = context.user_data.get('question', '')
-    
-    # Try AI checking first if available
-    if AI_AVAILABLE:
-        try:
-            prompt = f"""Проверь ответ.
+async def ai_check_answer(question, correct_ans, user_ans):
+    """Ask the LLM to judge an answer. Returns a verdict_cache.Verdict."""
+    prompt = f"""Проверь ответ.
 
 Вопрос: {question}
 Правильный ответ: {correct_ans}
@@ -239,99 +291,113 @@ async def check_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
 ПРАВИЛЬНО
 Байкал - самое глубокое озеро, глубина 1642 метра."""
 
-            response = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {"role": "system", "content": "Учитель. НЕ принимай 'не знаю','не понял','?','-'. Принимай опечатки. Пиши факты ТОЛЬКО на РУССКОМ языке. ЗАПРЕЩЕНЫ английские буквы."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.05,
-                max_tokens=85
-            )
-            
-            ai_response = response.choices[0].message.content.strip()
-            print(f"AI check response: {ai_response}")
-            
-            # Parse correctness
-            response_lower = ai_response.lower()
-            if "правильно" in response_lower:
-                pos_correct = response_lower.find("правильно")
-                pos_incorrect = response_lower.find("неправильно")
-                is_correct = (pos_incorrect == -1) or (pos_correct < pos_incorrect)
-            else:
-                is_correct = False
-            
-            # AGGRESSIVE filtering - remove ALL service lines
-            lines = ai_response.split('\n')
-            clean_lines = []
-            
-            for line in lines:
-                line_stripped = line.strip()
-                line_lower = line_stripped.lower()
-                
-                # Skip ALL service keywords
-                skip_keywords = [
-                    'правильно', 'неправильно',
-                    'проверка', 'ответ ученика', 'ответ учащегося',
-                    'вопрос:', 'ответ:', 'задача:', 'задание:'
-                ]
-                
-                should_skip = False
-                for keyword in skip_keywords:
-                    if keyword in line_lower and len(line_stripped) < 60:  # Short lines with keywords = service lines
-                        should_skip = True
-                        break
-                
-                if should_skip:
-                    continue
-                
-                # If CORRECT answer, skip "правильный ответ:"
-                if is_correct and 'правильный ответ' in line_lower:
-                    continue
-                
-                # Add meaningful lines
-                if line_stripped and len(line_stripped) > 3:
-                    clean_lines.append(line_stripped)
-            
-            explanation = '\n'.join(clean_lines).strip()
-            
-            if is_correct:
-                database.update_balance(update.effective_user.id, reward)
-                message = f"✅ Правильно! Ты заработал {reward} монет."
-                if explanation:
-                    message += f"\n\n💡 {explanation}"
-            else:
-                message = f"❌ Неверно."
-                if explanation:
-                    message += f"\n\n💡 {explanation}"
-                if "правильный ответ:" not in explanation.lower():
-                    message += f"\n\n💡 Правильный ответ: {correct_ans}"
-                    
-        except Exception as e:
-            print(f"AI Error: {e}")
-            if user_ans.lower().strip() == correct_ans.lower().strip():
-                database.update_balance(update.effective_user.id, reward)
-                message = f"✅ Правильно! Ты заработал {reward} монет."
-            else:
-                message = f"❌ Неверно. Правильный ответ: {correct_ans}."
+    response = await llm.complete(
+        system="Учитель. НЕ принимай 'не знаю','не понял','?','-'. Принимай опечатки. Пиши факты ТОЛЬКО на РУССКОМ языке. ЗАПРЕЩЕНЫ английские буквы.",
+        prompt=prompt,
+        temperature=0.05,
+        max_tokens=85,
+        purpose='check',
+        budget=llm.INTERACTIVE_BUDGET
+    )
+    
+    ai_response = response.text
+    print(f"AI check response: {ai_response}")
+    
+    # Parse correctness
+    response_lower = ai_response.lower()
+    if "правильно" in response_lower:
+        pos_correct = response_lower.find("правильно")
+        pos_incorrect = response_lower.find("неправильно")
+        is_correct = (pos_incorrect == -1) or (pos_correct < pos_incorrect)
     else:
-        if user_ans.lower().strip() == correct_ans.lower().strip():
-            database.update_balance(update.effective_user.id, reward)
-            message = f"✅ Правильно! Ты заработал {reward} монет."
+        is_correct = False
+    
+    # AGGRESSIVE filtering - remove ALL service lines
+    lines = ai_response.split('\n')
+    clean_lines = []
+    
+    for line in lines:
+        line_stripped = line.strip()
+        line_lower = line_stripped.lower()
+        
+        # Skip ALL service keywords
+        skip_keywords = [
+            'правильно', 'неправильно',
+            'проверка', 'ответ ученика', 'ответ учащегося',
+            'вопрос:', 'ответ:', 'задача:', 'задание:'
+        ]
+        
+        should_skip = False
+        for keyword in skip_keywords:
+            if keyword in line_lower and len(line_stripped) < 60:  # Short lines with keywords = service lines
+                should_skip = True
+                break
+        
+        if should_skip:
+            continue
+        
+        # If CORRECT answer, skip "правильный ответ:"
+        if is_correct and 'правильный ответ' in line_lower:
+            continue
+        
+        # Add meaningful lines
+        if line_stripped and len(line_stripped) > 3:
+            clean_lines.append(line_stripped)
+    
+    tokens = response.prompt_tokens + response.completion_tokens
+    return verdict_cache.Verdict(is_correct, '\n'.join(clean_lines).strip(), tokens)
+
+async def check_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_ans = update.message.text.strip()
+    correct_ans = str(context.user_data.get('ans'))
+    reward = context.user_data.get('reward')
+    question = context.user_data.get('question', '')
+    
+    # Decide locally when possible, the LLM only breaks ties
+    verdict = answer_checker.check(user_ans, correct_ans)
+    explanation = ""
+    
+    if verdict == answer_checker.UNCERTAIN:
+        # Someone may have given this very answer before
+        cached = await verdict_cache.get(question, correct_ans, user_ans)
+        if cached:
+            is_correct, explanation = cached.is_correct, cached.explanation
+        elif llm.AI_AVAILABLE:
+            try:
+                checked = await ai_check_answer(question, correct_ans, user_ans)
+                await verdict_cache.put(question, correct_ans, user_ans, checked)
+                is_correct, explanation = checked.is_correct, checked.explanation
+            except Exception as e:
+                print(f"AI Error: {e}")
+                is_correct = False
         else:
-            message = f"❌ Неверно. Правильный ответ: {correct_ans}."
+            is_correct = False
+    else:
+        is_correct = verdict == answer_checker.CORRECT
+    
+    if is_correct:
+        await db.update_balance(update.effective_user.id, reward)
+        message = f"✅ Правильно! Ты заработал {reward} монет."
+        if explanation:
+            message += f"\n\n💡 {explanation}"
+    elif explanation:
+        message = f"❌ Неверно.\n\n💡 {explanation}"
+        if "правильный ответ:" not in explanation.lower():
+            message += f"\n\n💡 Правильный ответ: {correct_ans}"
+    else:
+        message = f"❌ Неверно. Правильный ответ: {correct_ans}."
     
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=message)
-    await handlers_menu.show_main_menu(update, context)
+    await handlers_menu.show_main_menu(update, context, text=message)
     return ConversationHandler.END
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await context.bot.send_message(chat_id=update.effective_chat.id, text="Отменено.")
-    await handlers_menu.show_main_menu(update, context)
+    await handlers_menu.show_main_menu(update, context, text="Отменено.")
     return ConversationHandler.END
 
 def get_earn_conv_handler():
     return ConversationHandler(
+        name='earn',
+        persistent=True,
         entry_points=[MessageHandler(filters.Regex('^💰 Фин-Заработок$'), start_earning)],
         states={
             CHOOSING_SUBJECT: [MessageHandler(filters.TEXT & ~filters.COMMAND, choose_subject)],
@@ -1,25 +1,34 @@
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters, CallbackQueryHandler
-import database
+import db
 import handlers_menu
-import random
-import sqlite3
+import market_engine
+from cache import LRUCache
 
 # States
 CHOOSING_ITEM = 0
 
+# Items sell back for this share of the market price
+SELL_RATIO = 0.8
+
+# Screens that never change are built once; markups are immutable and can be shared
+MARKET_MENU_TEXT = "📈 **Биржа Активов**\n\nЧто хочешь сделать?"
+MARKET_MENU = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💰 Купить", callback_data="show_buy")],
+    [InlineKeyboardButton("💸 Продать", callback_data="show_sell")],
+    [InlineKeyboardButton("🎒 Мой Инвентарь", callback_data="inventory")],
+    [InlineKeyboardButton("🔙 Назад", callback_data="back")]
+])
+BACK_TO_MARKET = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Назад", callback_data="market_menu")]])
+INVENTORY_BACK = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Назад к Бирже", callback_data="market_menu")]])
+
+# (text, markup) of the buy menu per market tick; a new tick is a new key
+_buy_menus = LRUCache(2)
+
 async def market_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Main market menu with Buy/Sell options"""
-    msg = "📈 **Биржа Активов**\n\nЧто хочешь сделать?"
-    
-    keyboard = [
-        [InlineKeyboardButton("💰 Купить", callback_data="show_buy")],
-        [InlineKeyboardButton("💸 Продать", callback_data="show_sell")],
-        [InlineKeyboardButton("🎒 Мой Инвентарь", callback_data="inventory")],
-        [InlineKeyboardButton("🔙 Назад", callback_data="back")]
-    ]
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    msg = MARKET_MENU_TEXT
+    reply_markup = MARKET_MENU
     
     if update.callback_query:
         await update.callback_query.edit_message_text(text=msg, parse_mode='Markdown', reply_markup=reply_markup)
@@ -32,71 +41,59 @@ async def market_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
     return CHOOSING_ITEM
 
-async def show_buy_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show items available for purchase"""
+async def show_buy_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, notice=None):
+    """Show items available for purchase, with an optional result line on top"""
     query = update.callback_query
     
-    # Simulate price fluctuation
-    conn = sqlite3.connect(database.DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM market_items')
-    items = cursor.fetchall()
-    
-    # Randomly adjust prices slightly (+- 10%)
-    for item in items:
-        new_price = int(item[3] * random.uniform(0.9, 1.1))
-        cursor.execute('UPDATE market_items SET current_price = ? WHERE id = ?', (new_price, item[0]))
-    conn.commit()
+    # Prices move on the market tick, so the menu is rendered once per tick
+    market = await market_engine.current()
+    rendered = _buy_menus.get(market.tick)
+    if rendered is None:
+        rendered = render_buy_menu(market)
+        _buy_menus.set(market.tick, rendered)
+    msg, reply_markup = rendered
     
-    # Fetch updated items
-    cursor.execute('SELECT * FROM market_items')
-    items = cursor.fetchall()
-    conn.close()
-    
-    msg = "💰 **Купить Активы**\n\nЦены меняются каждый раз!\n\n"
+    if notice:
+        msg = f"{notice}\n\n{msg}"
+    await query.edit_message_text(text=msg, parse_mode='Markdown', reply_markup=reply_markup)
+    return CHOOSING_ITEM
+
+def render_buy_menu(market):
+    """(text, markup) of the buy menu for a market snapshot"""
+    lines = ["💰 **Купить Активы**\n\nЦены постоянно меняются!\n\n"]
     keyboard = []
     
-    for item in items:
-        msg += f"📦 *{item[1]}* — {item[3]} монет\n_{item[2]}_\n\n"
-        keyboard.append([InlineKeyboardButton(f"Купить {item[1]} ({item[3]} 💰)", callback_data=f"buy_{item[0]}")])
+    for item in market.items:
+        lines.append(f"📦 *{item.name}* — {item.price} монет\n_{item.description}_\n\n")
+        keyboard.append([InlineKeyboardButton(f"Купить {item.name} ({item.price} 💰)", callback_data=f"buy_{item.id}")])
         
     keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="market_menu")])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text(text=msg, parse_mode='Markdown', reply_markup=reply_markup)
-    return CHOOSING_ITEM
+    return "".join(lines), InlineKeyboardMarkup(keyboard)
 
-async def show_sell_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show inventory items available for sale"""
+async def show_sell_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, notice=None):
+    """Show inventory items available for sale, with an optional result line on top"""
     query = update.callback_query
     
-    user = database.get_user(update.effective_user.id)
-    items = database.get_inventory(user[0])
+    items = await db.get_sell_listing(update.effective_user.id)
     
     if not items:
         msg = "💸 **Продать Активы**\n\nУ тебя нет предметов для продажи!"
-        keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="market_menu")]]
+        reply_markup = BACK_TO_MARKET
     else:
         msg = "💸 **Продать Активы**\n\nВыбери что продать (цена = 80% от стоимости):\n\n"
         keyboard = []
         
-        # Get current market prices
-        conn = sqlite3.connect(database.DB_NAME)
-        cursor = conn.cursor()
-        
-        for item in items:
-            # Get market price for this item
-            cursor.execute('SELECT current_price FROM market_items WHERE name = ?', (item[0],))
-            result = cursor.fetchone()
-            if result:
-                sell_price = int(result[0] * 0.8)  # Sell for 80% of market price
-                msg += f"📦 *{item[0]}* (x{item[2]}) — {sell_price} монет\n"
-                keyboard.append([InlineKeyboardButton(f"Продать {item[0]} ({sell_price} 💰)", callback_data=f"sell_{item[0]}")])
+        for item_id, name, quantity, market_price in items:
+            sell_price = int(market_price * SELL_RATIO)
+            msg += f"📦 *{name}* (x{quantity}) — {sell_price} монет\n"
+            keyboard.append([InlineKeyboardButton(f"Продать {name} ({sell_price} 💰)", callback_data=f"sell_{item_id}")])
         
-        conn.close()
         keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="market_menu")])
+        reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    if notice:
+        msg = f"{notice}\n\n{msg}"
     
-    reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(text=msg, parse_mode='Markdown', reply_markup=reply_markup)
     return CHOOSING_ITEM
 
@@ -130,84 +127,46 @@ async def handle_market_callback(update: Update, context: ContextTypes.DEFAULT_T
     if data.startswith("buy_"):
         item_id = int(data.split("_")[1])
         
-        conn = sqlite3.connect(database.DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM market_items WHERE id = ?', (item_id,))
-        item = cursor.fetchone()
-        conn.close()
+        # Pay and add to inventory in one transaction
+        result = await db.buy_item(update.effective_user.id, item_id)
         
-        if not item:
-            await query.edit_message_text(text="Товар не найден.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Назад", callback_data="market_menu")]]))
+        if result.status == db.NOT_FOUND:
+            await query.edit_message_text(text="Товар не найден.", reply_markup=BACK_TO_MARKET)
             return CHOOSING_ITEM
             
-        user = database.get_user(update.effective_user.id)
-        wallet = user[6]
-        price = item[3]
-        
-        if wallet < price:
-            await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Недостаточно монет! Нужно {price}, а у тебя {wallet}.")
+        if result.status == db.NO_FUNDS:
+            await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Недостаточно монет! Нужно {result.price}, а у тебя {result.wallet}.")
             return CHOOSING_ITEM
-            
-        # Buy item
-        database.update_balance(update.effective_user.id, -price, is_savings=False)
-        database.add_to_inventory(user[0], item_id)
-        
-        await context.bot.send_message(chat_id=update.effective_chat.id, text=f"✅ Ты купил {item[1]} за {price} монет!")
         
-        # Refresh buy menu
-        await show_buy_menu(update, context)
+        # Refresh buy menu, the result goes on top of it (one edit instead of send + edit)
+        await show_buy_menu(update, context, notice=f"✅ Ты купил {result.name} за {result.price} монет!")
         return CHOOSING_ITEM
     
     if data.startswith("sell_"):
-        item_name = data.replace("sell_", "")
-        
-        user = database.get_user(update.effective_user.id)
+        item_id = data.split("_", 1)[1]
         
-        # Get market price
-        conn = sqlite3.connect(database.DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, current_price FROM market_items WHERE name = ?', (item_name,))
-        result = cursor.fetchone()
+        # Menus sent before the switch to ids still carry names
+        if not item_id.isdigit():
+            result = db.TradeResult(db.NOT_FOUND, None, 0, None)
+        else:
+            # Take from inventory and pay in one transaction
+            result = await db.sell_item(update.effective_user.id, int(item_id), SELL_RATIO)
         
-        if not result:
-            await query.edit_message_text(text="Предмет не найден на рынке.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Назад", callback_data="market_menu")]]))
-            conn.close()
+        if result.status == db.NOT_FOUND:
+            await query.edit_message_text(text="Предмет не найден на рынке.", reply_markup=BACK_TO_MARKET)
             return CHOOSING_ITEM
         
-        item_id, market_price = result
-        sell_price = int(market_price * 0.8)
-        
-        # Remove from inventory
-        cursor.execute('SELECT quantity FROM inventory WHERE user_id = ? AND item_id = ?', (user[0], item_id))
-        inv_result = cursor.fetchone()
-        
-        if not inv_result or inv_result[0] <= 0:
-            await query.edit_message_text(text="У тебя нет этого предмета!", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Назад", callback_data="market_menu")]]))
-            conn.close()
+        if result.status == db.NOT_OWNED:
+            await query.edit_message_text(text="У тебя нет этого предмета!", reply_markup=BACK_TO_MARKET)
             return CHOOSING_ITEM
         
-        # Decrease quantity
-        new_quantity = inv_result[0] - 1
-        if new_quantity > 0:
-            cursor.execute('UPDATE inventory SET quantity = ? WHERE user_id = ? AND item_id = ?', (new_quantity, user[0], item_id))
-        else:
-            cursor.execute('DELETE FROM inventory WHERE user_id = ? AND item_id = ?', (user[0], item_id))
-        
-        conn.commit()
-        conn.close()
-        
-        # Add money to wallet
-        database.update_balance(update.effective_user.id, sell_price, is_savings=False)
-        
-        await context.bot.send_message(chat_id=update.effective_chat.id, text=f"✅ Ты продал {item_name} за {sell_price} монет!")
-        
-        # Refresh sell menu
-        await show_sell_menu(update, context)
+        # Refresh sell menu, the result goes on top of it
+        await show_sell_menu(update, context, notice=f"✅ Ты продал {result.name} за {result.price} монет!")
         return CHOOSING_ITEM
 
 async def show_inventory(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = database.get_user(update.effective_user.id)
-    items = database.get_inventory(user[0])
+    user = await db.get_user(update.effective_user.id)
+    items = await db.get_inventory(user.id)
     
     if not items:
         msg = "🎒 **Твой Инвентарь**\n\nПусто! Купи что-нибудь на бирже."
@@ -216,8 +175,7 @@ async def show_inventory(update: Update, context: ContextTypes.DEFAULT_TYPE):
         for item in items:
             msg += f"📦 *{item[0]}* (x{item[2]})\n_{item[1]}_\n\n"
             
-    keyboard = [[InlineKeyboardButton("🔙 Назад к Бирже", callback_data="market_menu")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = INVENTORY_BACK
     
     if update.callback_query:
         await update.callback_query.edit_message_text(text=msg, parse_mode='Markdown', reply_markup=reply_markup)
@@ -230,10 +188,12 @@ async def back_to_market(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 def get_market_conv_handler():
     return ConversationHandler(
+        name='market',
+        persistent=True,
         entry_points=[MessageHandler(filters.Regex('^📈 Биржа$'), market_menu)],
         states={
             CHOOSING_ITEM: [
-                CallbackQueryHandler(handle_market_callback)
+                CallbackQueryHandler(handle_market_callback, pattern=r"^(back|market_menu|show_buy|show_sell|inventory|buy_\d+|sell_.+)$")
             ],
         },
         fallbacks=[CommandHandler('cancel', handlers_menu.show_main_menu)],
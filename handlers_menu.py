@@ -1,34 +1,51 @@
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes
 
-import database
-
-async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    keyboard = [
-        ['💰 Фин-Заработок', '👛 Кошелек'],
-        ['🏦 Сбережения', '📈 Биржа'],
-        ['🛒 Магазин', '👤 Герой']
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        text="Главное меню:",
-        reply_markup=reply_markup
-    )
+import db
+from cache import LRUCache
+
+MAIN_MENU = ReplyKeyboardMarkup([
+    ['💰 Фин-Заработок', '👛 Кошелек'],
+    ['🏦 Сбережения', '📈 Биржа'],
+    ['🛒 Магазин', '👤 Герой']
+], resize_keyboard=True)
+
+# Which reply keyboard each chat is showing: 'main', another name, or None
+# after ReplyKeyboardRemove. Chats we know nothing about (new, evicted, after
+# a restart) get the main menu re-sent.
+_keyboards = LRUCache(100000)
+
+def remember_keyboard(chat_id, name):
+    """Record the reply keyboard just sent to a chat (None = removed)"""
+    _keyboards.set(chat_id, name)
+
+async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, text=None):
+    """Put the main menu keyboard up.
+
+    With `text` (the result of the flow that just ended) the keyboard rides
+    along on that message. Without it, "Главное меню:" is only sent when the
+    chat isn't already showing the main menu.
+    """
+    chat_id = update.effective_chat.id
+    if text is None:
+        if _keyboards.get(chat_id) == 'main':
+            return
+        text = "Главное меню:"
+    await context.bot.send_message(chat_id=chat_id, text=text, reply_markup=MAIN_MENU)
+    remember_keyboard(chat_id, 'main')
 
 async def wallet_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = database.get_user(update.effective_user.id)
-    if user:
-        balance = user[6]
+    balance = await db.get_wallet(update.effective_user.id)
+    if balance is not None:
         await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Твой кошелек:\n💳 Баланс: {balance} монет")
     else:
         await context.bot.send_message(chat_id=update.effective_chat.id, text="Ошибка: Пользователь не найден.")
 
 async def hero_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = database.get_user(update.effective_user.id)
+    user = await db.get_user(update.effective_user.id)
     if user:
-        char_class = user[4]
-        level = user[5]
+        char_class = user.character_class
+        level = user.level
         await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Твой герой:\n🧙 Класс: {char_class}\n⭐ Уровень: {level}")
     else:
         await context.bot.send_message(chat_id=update.effective_chat.id, text="Ошибка: Пользователь не найден.")
@@ -1,7 +1,8 @@
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters, CallbackQueryHandler
-import database
+import db
 import handlers_menu
+from cache import LRUCache
 
 # Available shop games with prices and multipliers
 SHOP_GAMES = {
@@ -31,15 +32,12 @@ SHOP_GAMES = {
     }
 }
 
-async def shop_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show shop with available games"""
-    user = database.get_user(update.effective_user.id)
-    user_id = user[0]
-    wallet = user[6]
-    purchased = database.get_purchased_games(user_id)
-    
-    msg = f"🛒 **Магазин Игр**\n\n💳 Твой баланс: {wallet} монет\n\n"
-    msg += "Покупай игры с ПОВЫШЕННЫМИ наградами!\n\n"
+# (body text, markup) of the shop per set of owned games; a purchase changes
+# the set and so the key, nothing has to be invalidated
+_shop_menus = LRUCache(64)
+
+def render_shop(purchased):
+    body = "Покупай игры с ПОВЫШЕННЫМИ наградами!\n\n"
     
     keyboard = []
     for game_id, game in SHOP_GAMES.items():
@@ -55,19 +53,37 @@ async def shop_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         keyboard.append([InlineKeyboardButton(button_text, callback_data=callback)])
     
     keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="back")])
+    return body, InlineKeyboardMarkup(keyboard)
+
+async def shop_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, notice=None):
+    """Show shop with available games, with an optional result line on top"""
+    user = await db.get_user(update.effective_user.id)
+    user_id = user.id
+    wallet = user.wallet_balance
+    purchased = frozenset(await db.get_purchased_games(user_id))
+    
+    # Everything below the balance line depends only on what the user owns
+    rendered = _shop_menus.get(purchased)
+    if rendered is None:
+        rendered = render_shop(purchased)
+        _shop_menus.set(purchased, rendered)
+    body, reply_markup = rendered
+    
+    msg = f"{notice}\n\n" if notice else ""
+    msg += f"🛒 **Магазин Игр**\n\n💳 Твой баланс: {wallet} монет\n\n{body}"
     
     if update.callback_query:
         await update.callback_query.edit_message_text(
             text=msg,
             parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=reply_markup
         )
     else:
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text=msg,
             parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=reply_markup
         )
 
 async def handle_shop_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -83,30 +99,32 @@ async def handle_shop_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     
     if data.startswith("buy_"):
         game_id = data.replace("buy_", "")
-        game = SHOP_GAMES[game_id]
+        game = SHOP_GAMES.get(game_id)
+        if not game:
+            return
         
-        user = database.get_user(update.effective_user.id)
-        user_id = user[0]
-        wallet = user[6]
+        # Pay and record the purchase in one transaction
+        result = await db.buy_game(update.effective_user.id, game_id, game['price'])
         
-        if wallet < game['price']:
+        if result.status == db.ALREADY_OWNED:
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
-                text=f"❌ Недостаточно монет!\n💳 У тебя: {wallet}\n💸 Нужно: {game['price']}"
+                text="✅ Эта игра уже куплена! Играй в разделе 💰 Фин-Заработок"
             )
             return
         
-        # Purchase game
-        database.update_balance(update.effective_user.id, -game['price'], is_savings=False)
-        database.purchase_game(user_id, game_id)
+        if result.status == db.NO_FUNDS:
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text=f"❌ Недостаточно монет!\n💳 У тебя: {result.wallet}\n💸 Нужно: {game['price']}"
+            )
+            return
         
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text=f"✅ Покупка успешна!\n\n{game['name']} теперь доступна в разделе 💰 Фин-Заработок!\n\n🎁 Награда x{game['reward_multiplier']}"
+        # Refresh shop, the result goes on top of it (one edit instead of send + edit)
+        await shop_menu(
+            update, context,
+            notice=f"✅ Покупка успешна!\n\n{game['name']} теперь доступна в разделе 💰 Фин-Заработок!\n\n🎁 Награда x{game['reward_multiplier']}"
         )
-        
-        # Refresh shop
-        await shop_menu(update, context)
     
     elif data.startswith("owned_"):
         await context.bot.send_message(
@@ -120,4 +138,4 @@ def get_shop_handler():
 
 def get_shop_callback_handler():
     """Create callback handler for shop"""
-    return CallbackQueryHandler(handle_shop_callback, pattern="^(buy_|owned_|back)$")
+    return CallbackQueryHandler(handle_shop_callback, pattern=r"^((buy|owned)_[a-z]+|back)$")
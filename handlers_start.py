@@ -1,19 +1,18 @@
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
-import database
+import db
 import handlers_menu
 
 # States for the registration conversation
 CHOOSING_NAME, CHOOSING_CLASS, CHOOSING_AGE = range(3)
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = database.get_user(update.effective_user.id)
+    user = await db.get_user(update.effective_user.id)
     if user:
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text=f"С возвращением, {user[3]}! Твой баланс: {user[6]} монет."
+        await handlers_menu.show_main_menu(
+            update, context,
+            text=f"С возвращением, {user.character_name}! Твой баланс: {user.wallet_balance} монет."
         )
-        await handlers_menu.show_main_menu(update, context)
         return ConversationHandler.END
     
     await context.bot.send_message(
@@ -32,6 +31,7 @@ async def choose_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text=f"Отличное имя, {name}!\n\nТеперь выбери класс персонажа:",
         reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True)
     )
+    handlers_menu.remember_keyboard(update.effective_chat.id, 'classes')
     return CHOOSING_CLASS
 
 async def choose_class(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -47,6 +47,7 @@ async def choose_class(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text="Сколько тебе лет? (Напиши число, например: 10)",
         reply_markup=ReplyKeyboardRemove()
     )
+    handlers_menu.remember_keyboard(update.effective_chat.id, None)
     return CHOOSING_AGE
 
 async def choose_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -64,7 +65,7 @@ async def choose_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
     char_class = context.user_data['char_class']
     
     # Save to database
-    database.add_user(
+    await db.add_user(
         telegram_id=update.effective_user.id,
         username=update.effective_user.username,
         character_name=char_name,
@@ -72,29 +73,32 @@ async def choose_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
         age=age
     )
     
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        text=f"Герой создан! \nИмя: {char_name}\nКласс: {char_class}\nВозраст: {age}\n\nТеперь ты готов к финансовым приключениям!",
+    await handlers_menu.show_main_menu(
+        update, context,
+        text=f"Герой создан! \nИмя: {char_name}\nКласс: {char_class}\nВозраст: {age}\n\nТеперь ты готов к финансовым приключениям!"
     )
-    await handlers_menu.show_main_menu(update, context)
     return ConversationHandler.END
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await context.bot.send_message(chat_id=update.effective_chat.id, text="Регистрация отменена.", reply_markup=ReplyKeyboardRemove())
+    handlers_menu.remember_keyboard(update.effective_chat.id, None)
     return ConversationHandler.END
 
 async def reset(update: Update, context: ContextTypes.DEFAULT_TYPE):
     print(f"Resetting user {update.effective_user.id}")
-    database.delete_user(update.effective_user.id)
+    await db.delete_user(update.effective_user.id)
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text="Твой профиль сброшен! Напиши /start, чтобы начать заново.",
         reply_markup=ReplyKeyboardRemove()
     )
+    handlers_menu.remember_keyboard(update.effective_chat.id, None)
     return ConversationHandler.END
 
 def get_conv_handler():
     return ConversationHandler(
+        name='registration',
+        persistent=True,
         entry_points=[CommandHandler('start', start)],
         states={
             CHOOSING_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, choose_name)],
@@ -0,0 +1,61 @@
+"""Savings interest, computed in closed form.
+
+Interest compounds continuously at DAILY_RATE per day since the last
+settlement (users.savings_start_date), so it can be shown on read without
+touching the database and paid to everyone with one UPDATE (see
+database.settle_interest). Only whole coins are paid; the settlement time
+moves forward just as far as the paid coins cover, so fractions of a coin
+keep accruing instead of being lost.
+
+Savings stop growing at MAX_SAVINGS, so a long-forgotten deposit can't
+overflow a SQLite INTEGER and break settlement for everyone. Time spent at
+the cap earns nothing: settling a capped balance moves its settlement time
+to now, so that time can't be paid out later.
+"""
+import datetime
+import math
+
+DAILY_RATE = 0.05
+SECONDS_PER_DAY = 86400
+MAX_SAVINGS = 10 ** 12  # well inside int64 and exact as a float
+
+def _days(since, now):
+    start = datetime.datetime.fromisoformat(since)
+    return (now - start).total_seconds() / SECONDS_PER_DAY
+
+def accrued(savings, since, now=None):
+    """Whole coins earned on savings between since (ISO string) and now"""
+    if not savings or savings <= 0 or not since:
+        return 0
+    now = now or datetime.datetime.now()
+    if savings >= MAX_SAVINGS:
+        return 0
+    days = _days(since, now)
+    if days <= 0:
+        return 0
+    # Count no more days than it takes to reach the cap, so the power can't overflow
+    days = min(days, math.log(MAX_SAVINGS / savings) / math.log1p(DAILY_RATE))
+    return min(int(savings * ((1 + DAILY_RATE) ** days - 1)), MAX_SAVINGS - savings)
+
+def settled_since(savings, since, now=None):
+    """New settlement time after accrued() coins have been paid"""
+    now = now or datetime.datetime.now()
+    if not savings or savings <= 0 or not since:
+        return now.isoformat()
+    if savings >= MAX_SAVINGS:
+        return now.isoformat()  # nothing accrues at the cap
+    paid = accrued(savings, since, now)
+    if paid >= MAX_SAVINGS - savings:
+        return now.isoformat()  # capped: the rest of the period is forfeited, not owed
+    if paid == 0:
+        return since
+    days_paid = math.log1p(paid / savings) / math.log1p(DAILY_RATE)
+    start = datetime.datetime.fromisoformat(since)
+    return (start + datetime.timedelta(days=days_paid)).isoformat()
+
+# SQLite versions of the two functions above; `now` arrives as an ISO string
+def sql_accrued(savings, since, now):
+    return accrued(savings, since, datetime.datetime.fromisoformat(now))
+
+def sql_settled_since(savings, since, now):
+    return settled_since(savings, since, datetime.datetime.fromisoformat(now))
@@ -0,0 +1,142 @@
+"""Async Groq (OpenAI-compatible) client shared by the earn handlers.
+
+One AsyncOpenAI client with a keep-alive connection pool, a per-call
+timeout, a global cap on in-flight requests and retries with exponential
+backoff, so waiting on the model never blocks the event loop.
+
+Every call goes through a circuit breaker: while Groq keeps failing or is
+slow, calls fail at once and the handlers use their local fallbacks.
+Interactive callers also pass a latency budget for the whole call,
+retries included.
+"""
+import asyncio
+import os
+import random
+import time
+from collections import namedtuple
+
+import metrics
+from circuit_breaker import CLOSED, CircuitBreaker
+
+MODEL = "llama-3.1-8b-instant"
+BASE_URL = "https://api.groq.com/openai/v1"
+
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '8'))          # seconds per attempt
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_BACKOFF = 0.5                                            # first retry delay, doubles each time
+LLM_SLOW_CALL = float(os.getenv('LLM_SLOW_CALL', '4'))      # seconds; slower calls count against the breaker
+INTERACTIVE_BUDGET = float(os.getenv('LLM_INTERACTIVE_BUDGET', '5'))  # while a kid is waiting
+
+Completion = namedtuple('Completion', ['text', 'prompt_tokens', 'completion_tokens'])
+
+class LLMError(Exception):
+    """The model could not be reached or gave no usable answer"""
+
+# Try to import OpenAI for Groq
+try:
+    import httpx
+    import openai
+
+    client = openai.AsyncOpenAI(
+        api_key=os.getenv('GROQ_API_KEY'),
+        base_url=BASE_URL,
+        max_retries=0,  # retries are handled below, with our own backoff
+        timeout=LLM_TIMEOUT,
+        http_client=openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONCURRENCY,
+                max_keepalive_connections=LLM_MAX_CONCURRENCY,
+                keepalive_expiry=60,
+            ),
+        ),
+    )
+    RETRYABLE_ERRORS = (
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+    AI_AVAILABLE = True
+except Exception:
+    client = None
+    RETRYABLE_ERRORS = ()
+    AI_AVAILABLE = False
+    print("AI not available, using simple answer checking")
+
+_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+breaker = CircuitBreaker('llm', slow_call=LLM_SLOW_CALL)
+
+async def _request(messages, temperature, max_tokens, timeout, purpose):
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with _semaphore:
+                return await client.chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=timeout,
+                )
+        except RETRYABLE_ERRORS as e:
+            metrics.LLM_ERRORS.inc(purpose, e.__class__.__name__)
+            if attempt == LLM_MAX_RETRIES or breaker.state != CLOSED:
+                raise LLMError(f"LLM failed after {attempt + 1} attempts: {e}") from e
+            delay = LLM_BACKOFF * (2 ** attempt) * random.uniform(0.8, 1.2)
+            print(f"LLM error ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        except Exception as e:
+            metrics.LLM_ERRORS.inc(purpose, e.__class__.__name__)
+            raise LLMError(str(e)) from e
+
+async def complete(system, prompt, temperature, max_tokens, timeout=LLM_TIMEOUT, purpose='chat', budget=None):
+    """Ask the model one chat question and return a Completion.
+
+    `purpose` only labels the call in metrics ('question', 'check', ...).
+    `budget` caps the seconds spent on the call, retries included.
+    Raises LLMError when AI is unavailable, the circuit is open, the budget
+    ran out or every attempt failed.
+    """
+    if not AI_AVAILABLE:
+        raise LLMError("AI not available")
+    ticket = breaker.acquire()
+    if ticket is None:
+        metrics.LLM_ERRORS.inc(purpose, 'CircuitOpen')
+        raise LLMError("LLM circuit is open")
+
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+
+    start = time.perf_counter()
+    ok = False
+    try:
+        request = _request(messages, temperature, max_tokens, timeout, purpose)
+        if budget is None:
+            response = await request
+        else:
+            response = await asyncio.wait_for(request, budget)
+        ok = True
+    except asyncio.TimeoutError as e:
+        metrics.LLM_ERRORS.inc(purpose, 'BudgetExceeded')
+        raise LLMError(f"LLM latency budget of {budget:.1f}s spent") from e
+    finally:
+        elapsed = time.perf_counter() - start
+        breaker.record(ticket, ok, elapsed)
+        metrics.LLM_SECONDS.observe(elapsed, purpose, 'ok' if ok else 'error')
+
+    text = (response.choices[0].message.content or "").strip()
+    usage = response.usage
+    completion = Completion(
+        text=text,
+        prompt_tokens=usage.prompt_tokens if usage else 0,
+        completion_tokens=usage.completion_tokens if usage else 0,
+    )
+    metrics.LLM_TOKENS.inc(purpose, 'prompt', amount=completion.prompt_tokens)
+    metrics.LLM_TOKENS.inc(purpose, 'completion', amount=completion.completion_tokens)
+    return completion
+
+async def close():
+    if client is not None:
+        await client.close()
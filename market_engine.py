@@ -0,0 +1,105 @@
+"""Market prices that move on a fixed global tick.
+
+Every TICK_SECONDS all prices take one step of a seeded random walk: the
+step for (item, tick) always draws the same random numbers, so the price at
+any tick can be recomputed from the previous one. The current prices live
+in memory as one immutable snapshot that readers just grab; the tick loop
+writes each new snapshot to SQLite in a single transaction and appends it
+to the price_history table (see history()).
+"""
+import asyncio
+import math
+import os
+import random
+import time
+from collections import namedtuple
+
+import db
+
+TICK_SECONDS = int(os.getenv('MARKET_TICK_SECONDS', '60'))
+SEED = os.getenv('MARKET_SEED', 'finquest')
+
+STEP = 0.1          # each tick moves a price by up to +-10%
+REVERSION = 0.02    # ...and pulls it 2% of the way back towards its base price
+MAX_CATCH_UP = 10000  # ticks replayed after downtime before we just jump ahead
+HISTORY_TICKS = int(os.getenv('MARKET_HISTORY_TICKS', '10080'))  # a week of minute ticks
+
+MarketItem = namedtuple('MarketItem', ['id', 'name', 'description', 'price', 'base_price'])
+Snapshot = namedtuple('Snapshot', ['tick', 'items'])
+
+_snapshot = None
+_load_lock = asyncio.Lock()
+
+def current_tick(now=None):
+    return int((time.time() if now is None else now) // TICK_SECONDS)
+
+def next_price(item_id, base_price, price, tick):
+    """Price of an item at tick, given its price at tick - 1"""
+    rng = random.Random(f"{SEED}:{item_id}:{tick}")
+    step = rng.uniform(-STEP, STEP)
+    pull = REVERSION * math.log(base_price / price)
+    return max(1, round(price * math.exp(step + pull)))
+
+def _step(items, tick):
+    return tuple(
+        item._replace(price=next_price(item.id, item.base_price, item.price, tick))
+        for item in items
+    )
+
+def snapshot():
+    """The current Snapshot, or None before load()"""
+    return _snapshot
+
+async def current():
+    """The current Snapshot, loading it from the database on first use"""
+    if _snapshot is None:
+        await load()
+    return _snapshot
+
+async def load():
+    """Read prices from the database and replay any ticks missed while offline"""
+    global _snapshot
+    async with _load_lock:
+        if _snapshot is not None:
+            return
+        tick, rows = await db.get_market_state()
+        items = tuple(MarketItem(*row) for row in rows)
+        now = current_tick()
+        if tick is None or now - tick > MAX_CATCH_UP:
+            tick = now - 1
+
+        for t in range(tick + 1, now + 1):
+            items = _step(items, t)
+        if now != tick:
+            await db.save_market_tick(now, [(item.id, item.price) for item in items], HISTORY_TICKS)
+        _snapshot = Snapshot(now, items)
+
+async def advance(tick):
+    """Move all prices to tick and persist them as one snapshot"""
+    global _snapshot
+    old = await current()
+    if tick <= old.tick:
+        return old
+    items = old.items
+    for t in range(old.tick + 1, tick + 1):
+        items = _step(items, t)
+    await db.save_market_tick(tick, [(item.id, item.price) for item in items], HISTORY_TICKS)
+    _snapshot = Snapshot(tick, items)
+    return _snapshot
+
+async def tick_loop():
+    """Background task: advance the market at every tick boundary"""
+    await current()
+    while True:
+        next_tick = current_tick() + 1
+        await asyncio.sleep(max(0, next_tick * TICK_SECONDS - time.time()))
+        try:
+            await advance(next_tick)
+        except Exception as e:
+            print(f"Market tick error: {e}")
+
+async def history(item_id, last=None, start_tick=None, end_tick=None):
+    """[(tick, price), ...] of an item: the last N points, or a tick range"""
+    if last is not None:
+        return await db.get_price_history(item_id, last)
+    return await db.get_price_history_range(item_id, start_tick, end_tick)
@@ -0,0 +1,187 @@
+"""In-process metrics in the Prometheus text format.
+
+Counters, gauges and histograms are plain thread-safe objects (DB calls
+record from the executor threads); render() turns all of them into the text
+served at /metrics (see webhook.py). Handler latency is recorded by wrapping
+every handler callback once at startup (instrument_handlers), DB calls by
+db._offload and LLM calls by llm.complete.
+"""
+import functools
+import threading
+import time
+
+from telegram.ext import ConversationHandler
+
+# Seconds; Telegram round trips and LLM calls land in the upper buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f'{self.name}{_labels(self.label_names, key)} {_number(value)}' for key, value in values
+        ]
+
+class Gauge(_Metric):
+    """A value that is set, or read from a function at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._function = None
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def set_function(self, func):
+        self._function = func
+
+    def render(self):
+        if self._function is not None:
+            try:
+                values = [((), self._function())]
+            except Exception:
+                values = []
+        else:
+            with self._lock:
+                values = sorted(self._values.items())
+        return self._header() + [
+            f'{self.name}{_labels(self.label_names, key)} {_number(value)}' for key, value in values
+        ]
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = entry[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(c), s, n)) for key, (c, s, n) in self._values.items())
+        lines = self._header()
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = _labels(self.label_names, key, [('le', _number(bound))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, key)} {count}')
+        return lines
+
+def render():
+    """All metrics as Prometheus exposition text"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+HANDLER_SECONDS = Histogram('bot_handler_seconds', 'Handler callback latency', ['handler'])
+HANDLER_ERRORS = Counter('bot_handler_errors_total', 'Handler callbacks that raised', ['handler'])
+UPDATE_QUEUE_DEPTH = Gauge('bot_update_queue_depth', 'Updates received but not yet picked up')
+UPDATES_PENDING = Gauge('bot_updates_pending', 'Picked-up updates waiting for a user lock or a concurrency slot')
+USERS_IN_FLIGHT = Gauge('bot_users_in_flight', 'Users with an update being processed or waiting')
+
+OUTBOX_WAITS = Counter('bot_outbox_waits_total', 'Requests that waited for a flood-limit token', ['bucket'])
+OUTBOX_RETRY_AFTER = Counter('bot_outbox_retry_after_total', 'RetryAfter errors from Telegram')
+
+DB_SECONDS = Histogram('db_call_seconds', 'Time spent in a database.py function', ['function'], DB_BUCKETS)
+DB_STATEMENTS = Counter('db_statements_total', 'SQL statements executed', ['function'])
+
+LLM_SECONDS = Histogram('llm_request_seconds', 'LLM call latency, retries included', ['purpose', 'outcome'])
+LLM_TOKENS = Counter('llm_tokens_total', 'LLM tokens used', ['purpose', 'kind'])
+LLM_ERRORS = Counter('llm_errors_total', 'Failed LLM attempts', ['purpose', 'error'])
+
+BREAKER_STATE = Gauge('circuit_breaker_state', 'Circuit state: 0 closed, 1 half-open, 2 open', ['circuit'])
+BREAKER_TRANSITIONS = Counter('circuit_breaker_transitions_total', 'Circuit state changes', ['circuit', 'state'])
+
+VERDICT_LOOKUPS = Counter('verdict_cache_lookups_total', 'Answer verdict lookups by tier that answered', ['result'])
+VERDICT_TOKENS_SAVED = Counter('verdict_cache_tokens_saved_total', 'LLM tokens not spent thanks to cached verdicts')
+
+def handlers(application):
+    """Every leaf handler of the application, including those inside ConversationHandlers"""
+    for group in application.handlers.values():
+        for handler in group:
+            if isinstance(handler, ConversationHandler):
+                yield from handler.entry_points
+                for state_handlers in handler.states.values():
+                    yield from state_handlers
+                yield from handler.fallbacks
+            else:
+                yield handler
+
+def instrument_handlers(application):
+    """Record latency and errors of every handler callback under its function name"""
+    for handler in handlers(application):
+        handler.callback = _timed(handler.callback)
+    UPDATE_QUEUE_DEPTH.set_function(application.update_queue.qsize)
+
+def _timed(callback):
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        start = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, name)
+    return wrapper
@@ -0,0 +1,210 @@
+"""Questions that need no AI: a math generator and the data/questions.tsv bank.
+
+math_question(age) makes up an example for the kid's age band. Logic and
+world questions are sampled from data/questions.tsv (built by
+data/make_questions.py), whose lines are sorted by subject and age band.
+The file is memory-mapped on first use and indexed once: an array of line
+offsets plus the line range of every (subject, band), so a sample is one
+random index and one slice of the map, and startup reads nothing.
+"""
+import mmap
+import os
+import random
+from array import array
+
+import question_pool
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'questions.tsv')
+SAMPLE_PROBES = 8  # random tries before scanning for a question the user hasn't seen
+
+# Used when the bank file is missing or unreadable
+BUILTIN = {
+    'logic': [
+        ("Что можно сломать, даже если не трогать?", "обещание"),
+        ("Чем больше из нее берешь, тем больше она становится?", "яма"),
+        ("В комнате горело 5 свечей. 2 погасли. Сколько осталось?", "2"),
+    ],
+    'world': [
+        ("Сколько планет в Солнечной системе?", "8"),
+        ("Самое глубокое озеро в мире?", "байкал"),
+        ("Какой газ мы выдыхаем?", "углекислый"),
+    ],
+}
+
+_map = None
+_offsets = None  # start of every line, plus the end of the file
+_ranges = None   # (subject, band) -> (first line, last line + 1)
+
+def _load():
+    global _map, _offsets, _ranges
+    with open(PATH, 'rb') as f:
+        _map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _offsets = array('L')
+    _ranges = {}
+    pos, size = 0, len(_map)
+    while pos < size:
+        end = _map.find(b'\n', pos)
+        if end == -1:
+            end = size
+        subject_end = _map.find(b'\t', pos, end)
+        band_end = _map.find(b'\t', subject_end + 1, end)
+        key = (_map[pos:subject_end].decode(), _map[subject_end + 1:band_end].decode())
+        first, _ = _ranges.get(key, (len(_offsets), 0))
+        _ranges[key] = (first, len(_offsets) + 1)
+        _offsets.append(pos)
+        pos = end + 1
+    _offsets.append(size + 1 if _map[size - 1:] != b'\n' else size)
+    print(f"Offline question bank: {len(_offsets) - 1} questions in {len(_ranges)} groups")
+
+def _line(index):
+    start, end = _offsets[index], _offsets[index + 1] - 1
+    _, _, question, answer = _map[start:end].decode().split('\t')
+    return question, answer
+
+def _index():
+    global _ranges
+    if _ranges is None:
+        try:
+            _load()
+        except (OSError, ValueError) as e:
+            print(f"Offline question bank unavailable: {e}")
+            _ranges = {}  # don't retry on every question
+    return _ranges
+
+def size():
+    """Number of questions in the bank"""
+    return len(_offsets) - 1 if _index() else 0
+
+def sample(subject, age, seen=None):
+    """A random (question, answer) from the bank for this subject and age.
+
+    With a seen_questions.SeenQuestions, lines the user was already asked
+    are skipped and the chosen one is marked; once the whole band is used
+    up it starts over.
+    """
+    span = _index().get((subject, question_pool.age_band(age)))
+    if span is None:
+        return random.choice(BUILTIN[subject])
+    if seen is None:
+        return _line(random.randrange(*span))
+
+    # A few random probes find a fresh line until most of the band is used up
+    for _ in range(SAMPLE_PROBES):
+        index = random.randrange(*span)
+        if not seen.bank_has(index):
+            break
+    else:
+        unseen = seen.bank_unseen(*span)
+        if not unseen:
+            seen.bank_clear(*span)
+            unseen = range(*span)
+        index = random.choice(unseen)
+    seen.bank_add(index)
+    return _line(index)
+
+def math_question(age, seen=None):
+    """A generated (question, answer) example; harder operations for older kids.
+
+    With a seen_questions.SeenQuestions, examples the user already had are
+    regenerated a few times and the chosen one is marked.
+    """
+    band = question_pool.age_band(age)
+    for _ in range(SAMPLE_PROBES):
+        question, answer = random.choice(MATH_KINDS[band])()
+        if seen is None or not seen.has(question):
+            break
+    if seen is not None:
+        seen.add(question)
+    return question, answer
+
+def _young_sum():
+    n1, n2 = random.randint(1, 10), random.randint(1, 10)
+    if random.random() < 0.5:
+        return f"{n1} + {n2} = ?", str(n1 + n2)
+    n1, n2 = max(n1, n2), min(n1, n2)
+    return f"{n1} - {n2} = ?", str(n1 - n2)
+
+def _young_missing():
+    n1, total = random.randint(1, 9), random.randint(10, 20)
+    return f"? + {n1} = {total}. Какое число пропущено?", str(total - n1)
+
+def _young_neighbour():
+    n = random.randint(2, 99)
+    if random.random() < 0.5:
+        return f"Какое число идёт после {n}?", str(n + 1)
+    return f"Какое число стоит перед {n}?", str(n - 1)
+
+def _young_compare():
+    n1, n2 = random.sample(range(1, 100), 2)
+    return f"Какое число больше: {n1} или {n2}?", str(max(n1, n2))
+
+def _middle_arithmetic():
+    n1, n2 = random.randint(10, 50), random.randint(2, 10)
+    op = random.choice(['+', '-', '*'])
+    ans = {'+': n1 + n2, '-': n1 - n2, '*': n1 * n2}[op]
+    return f"{n1} {op} {n2} = ?", str(ans)
+
+def _middle_table():
+    n1, n2 = random.randint(2, 10), random.randint(2, 10)
+    if random.random() < 0.5:
+        return f"{n1} * {n2} = ?", str(n1 * n2)
+    return f"{n1 * n2} / {n2} = ?", str(n1)
+
+def _middle_missing_factor():
+    n1, n2 = random.randint(2, 10), random.randint(2, 10)
+    return f"? * {n1} = {n1 * n2}. Какое число пропущено?", str(n2)
+
+def _middle_three_terms():
+    n1, n2, n3 = random.randint(10, 40), random.randint(5, 30), random.randint(1, 20)
+    return f"{n1} + {n2} - {n3} = ?", str(n1 + n2 - n3)
+
+def _middle_half():
+    n = random.randint(2, 50) * 2
+    if random.random() < 0.5:
+        return f"Сколько будет половина от {n}?", str(n // 2)
+    return f"Увеличь {n} в 2 раза. Сколько получится?", str(n * 2)
+
+def _teen_arithmetic():
+    n1, n2 = random.randint(20, 100), random.randint(5, 20)
+    op = random.choice(['+', '-', '*', '/'])
+    if op == '/':
+        n1 = n1 * n2
+    ans = {'+': n1 + n2, '-': n1 - n2, '*': n1 * n2, '/': n1 // n2}[op]
+    return f"{n1} {op} {n2} = ?", str(ans)
+
+def _teen_order():
+    n1, n2, n3 = random.randint(2, 20), random.randint(2, 12), random.randint(2, 12)
+    if random.random() < 0.5:
+        return f"{n1} + {n2} * {n3} = ?", str(n1 + n2 * n3)
+    return f"({n1} + {n2}) * {n3} = ?", str((n1 + n2) * n3)
+
+def _teen_square():
+    n = random.randint(2, 20)
+    return f"Сколько будет {n} в квадрате?", str(n * n)
+
+def _teen_percent():
+    percent = random.choice([10, 20, 25, 50, 75])
+    n = random.randint(1, 20) * 20
+    return f"Сколько будет {percent}% от {n}?", str(n * percent // 100)
+
+def _teen_fraction():
+    denominator = random.choice([2, 3, 4, 5, 10])
+    numerator = random.randint(1, denominator - 1)
+    n = random.randint(2, 20) * denominator
+    return f"Сколько будет {numerator}/{denominator} от {n}?", str(n * numerator // denominator)
+
+def _teen_negative():
+    n1, n2 = random.randint(1, 30), random.randint(31, 60)
+    return f"{n1} - {n2} = ?", str(n1 - n2)
+
+def _teen_riddle():
+    n, k, b = random.randint(1, 15), random.randint(2, 9), random.randint(1, 30)
+    return f"Задумали число, умножили его на {k} и прибавили {b}. Получилось {k * n + b}. Какое число задумали?", str(n)
+
+MATH_KINDS = {
+    'young': [_young_sum, _young_sum, _young_missing, _young_neighbour, _young_compare],
+    'middle': [_middle_arithmetic, _middle_arithmetic, _middle_table, _middle_missing_factor,
+               _middle_three_terms, _middle_half],
+    'teen': [_teen_arithmetic, _teen_arithmetic, _teen_order, _teen_square, _teen_percent,
+             _teen_fraction, _teen_negative, _teen_riddle],
+}
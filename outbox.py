@@ -0,0 +1,154 @@
+"""Flood control for outgoing Bot API calls.
+
+FloodLimiter plugs into the Application as its rate limiter, so every
+request the handlers make passes through it:
+
+- a global token bucket (Telegram allows about 30 messages per second)
+- a token bucket per chat (about 1 message per second, short bursts are
+  fine; group chats get far less), taken in FIFO order so messages to one
+  chat keep their order
+- priority lanes: INTERACTIVE requests (replies to a user's action, the
+  default) get global tokens before BACKGROUND ones, e.g.
+  bot.send_message(..., rate_limit_args={'priority': outbox.BACKGROUND})
+- RetryAfter: the whole bot pauses for the time Telegram asked for, then
+  the request is retried up to MAX_RETRIES times
+
+Coalescing happens in the handlers: a purchase result is shown in the edit
+of the menu instead of a separate message (see the `notice` arguments in
+handlers_market and handlers_shop).
+"""
+import asyncio
+import datetime
+import os
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+import metrics
+from cache import LRUCache
+
+INTERACTIVE, BACKGROUND = 0, 1
+
+GLOBAL_RATE = float(os.getenv('FLOOD_GLOBAL_RATE', '30'))    # requests per second
+CHAT_RATE = float(os.getenv('FLOOD_CHAT_RATE', '1'))         # per private chat
+CHAT_BURST = int(os.getenv('FLOOD_CHAT_BURST', '3'))
+GROUP_RATE = 20 / 60                                          # per group chat
+MAX_RETRIES = int(os.getenv('FLOOD_MAX_RETRIES', '2'))
+MAX_CHATS = 10000  # per-chat buckets kept; idle ones are evicted first
+
+# Not messages: long polling and webhook setup are never throttled
+UNLIMITED_ENDPOINTS = {'getUpdates', 'setWebhook', 'deleteWebhook', 'getMe'}
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Take a token and return 0, or return the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class _Chat:
+    __slots__ = ('bucket', 'lock')
+
+    def __init__(self, chat_id):
+        if isinstance(chat_id, int) and chat_id < 0:
+            self.bucket = TokenBucket(GROUP_RATE, CHAT_BURST)
+        else:
+            self.bucket = TokenBucket(CHAT_RATE, CHAT_BURST)
+        self.lock = asyncio.Lock()
+
+def _seconds(retry_after):
+    if isinstance(retry_after, datetime.timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+class FloodLimiter(BaseRateLimiter):
+    def __init__(self, global_rate=GLOBAL_RATE, max_retries=MAX_RETRIES):
+        self._global = TokenBucket(global_rate, max(1, int(global_rate)))
+        self._chats = LRUCache(MAX_CHATS)
+        self._waiting = [0, 0]  # requests waiting for a global token, per lane
+        self._paused_until = 0.0
+        self.max_retries = max_retries
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _chat(self, chat_id):
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = _Chat(chat_id)
+            self._chats.set(chat_id, chat)
+        return chat
+
+    async def _pause(self):
+        while (wait := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(wait)
+
+    async def _take_global(self, priority):
+        self._waiting[priority] += 1
+        waited = False
+        try:
+            while True:
+                await self._pause()
+                if any(self._waiting[:priority]):
+                    wait = 1 / self._global.rate  # let the more urgent lane go first
+                else:
+                    wait = self._global.take()
+                    if wait == 0:
+                        return
+                if not waited:
+                    metrics.OUTBOX_WAITS.inc('global')
+                    waited = True
+                await asyncio.sleep(wait)
+        finally:
+            self._waiting[priority] -= 1
+
+    async def _take_chat(self, chat):
+        wait = chat.bucket.take()
+        if wait > 0:
+            metrics.OUTBOX_WAITS.inc('chat')
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = chat.bucket.take()
+
+    async def _send(self, callback, args, kwargs, endpoint, priority, chat):
+        for attempt in range(self.max_retries + 1):
+            if chat is not None:
+                await self._take_chat(chat)
+            await self._take_global(priority)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = _seconds(e.retry_after)
+                self._paused_until = max(self._paused_until, time.monotonic() + wait)
+                metrics.OUTBOX_RETRY_AFTER.inc()
+                print(f"Flood limit hit on {endpoint}, pausing for {wait:.0f}s")
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint in UNLIMITED_ENDPOINTS:
+            return await callback(*args, **kwargs)
+
+        priority = (rate_limit_args or {}).get('priority', INTERACTIVE)
+        chat_id = data.get('chat_id')
+        if chat_id is None:
+            return await self._send(callback, args, kwargs, endpoint, priority, None)
+
+        # One request per chat at a time, so a chat's messages arrive in order
+        chat = self._chat(chat_id)
+        async with chat.lock:
+            return await self._send(callback, args, kwargs, endpoint, priority, chat)
@@ -0,0 +1,142 @@
+"""Write-behind SQLite persistence for user_data and conversation states.
+
+The Application hands every changed user_data / conversation state to the
+persistence once per update_interval (FLUSH_MS), not per update. Those calls
+only serialize the value into an in-memory buffer; the buffer is then
+written with one transaction per interval, and once more on shutdown, so a
+restart loses at most the last FLUSH_MS of state.
+
+Values are stored as JSON: everything the handlers keep in user_data
+(question, answer, reward, bank action, registration fields) is plain data.
+"""
+import asyncio
+import json
+import os
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+import db
+
+FLUSH_MS = int(os.getenv('PERSIST_FLUSH_MS', '1000'))
+RETRY_SECONDS = 5  # wait before writing again after a failed write
+
+class SQLitePersistence(BasePersistence):
+    def __init__(self, flush_ms=FLUSH_MS):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=flush_ms / 1000,
+        )
+        self._dirty_users = {}   # user_id -> JSON text, None = delete
+        self._dirty_states = {}  # (conversation name, key JSON) -> state JSON, None = delete
+        self._write_lock = asyncio.Lock()
+        self._flush_task = None
+        self._closing = False
+        self._retrying = False  # _flush_task is waiting out RETRY_SECONDS, flush may cancel it
+
+    # Loading, once at startup
+
+    async def get_user_data(self):
+        return {user_id: json.loads(data) for user_id, data in await db.persisted_user_data()}
+
+    async def get_conversations(self, name):
+        return {
+            tuple(json.loads(key)): json.loads(state)
+            for key, state in await db.persisted_conversations(name)
+        }
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    # Buffering
+
+    async def update_user_data(self, user_id, data):
+        try:
+            self._dirty_users[user_id] = json.dumps(data, ensure_ascii=False) if data else None
+        except TypeError as e:
+            print(f"Persistence: user_data of {user_id} is not JSON-serializable: {e}")
+            return
+        self._schedule_write()
+
+    async def drop_user_data(self, user_id):
+        self._dirty_users[user_id] = None
+        self._schedule_write()
+
+    async def update_conversation(self, name, key, new_state):
+        state = None if new_state is None else json.dumps(new_state)
+        self._dirty_states[(name, json.dumps(key))] = state
+        self._schedule_write()
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    # Writing
+
+    def _schedule_write(self):
+        # The Application hands over all changes of one interval back to back;
+        # the task runs after them, so they end up in one transaction.
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._write())
+
+    async def _write(self, delay=0):
+        if delay:
+            await asyncio.sleep(delay)
+            self._retrying = False
+        failed = False
+        async with self._write_lock:
+            users, self._dirty_users = self._dirty_users, {}
+            states, self._dirty_states = self._dirty_states, {}
+            if not users and not states:
+                return
+            try:
+                await db.persist(
+                    list(users.items()),
+                    [(name, key, state) for (name, key), state in states.items()],
+                )
+            except Exception as e:
+                print(f"Persistence write error: {e}")
+                failed = True
+                # Keep the values for the next attempt unless newer ones arrived meanwhile
+                for user_id, data in users.items():
+                    self._dirty_users.setdefault(user_id, data)
+                for key, state in states.items():
+                    self._dirty_states.setdefault(key, state)
+
+        # Changes that arrived during the write, or a failed batch, get their own
+        # write; _schedule_write skipped them because this task was still running.
+        if (self._dirty_users or self._dirty_states) and not self._closing:
+            self._retrying = failed
+            self._flush_task = asyncio.create_task(self._write(RETRY_SECONDS if failed else 0))
+
+    async def flush(self):
+        """Write whatever is still buffered (called by the Application on shutdown)"""
+        self._closing = True
+        task = self._flush_task
+        if task is not None:
+            if self._retrying:
+                task.cancel()  # started or not, it is only sleeping; the write below covers it
+            await asyncio.wait([task])  # unlike await, doesn't raise the task's cancellation
+        await self._write()
@@ -0,0 +1,99 @@
+"""Pool of pre-generated AI questions per (subject, age band).
+
+A background task keeps every pool between LOW_WATERMARK and
+HIGH_WATERMARK questions, so choose_subject serves a question with a single
+indexed DELETE ... RETURNING instead of waiting for the LLM. The pool lives
+in SQLite and survives restarts.
+"""
+import asyncio
+import os
+
+import answer_checker
+import db
+
+SUBJECTS = ('math', 'logic', 'world')
+
+# Age used when generating for each band; bands match the fallback math tiers
+AGE_BANDS = {'young': 7, 'middle': 10, 'teen': 13}
+
+LOW_WATERMARK = int(os.getenv('POOL_LOW_WATERMARK', '5'))
+HIGH_WATERMARK = int(os.getenv('POOL_HIGH_WATERMARK', '20'))
+BATCH_SIZE = int(os.getenv('QUESTION_BATCH_SIZE', '10'))  # questions asked for per LLM call
+REFILL_INTERVAL = 60  # seconds between checks when nobody wakes the refiller
+
+_counts = {}
+_refill_needed = asyncio.Event()
+
+def age_band(age):
+    if age < 8:
+        return 'young'
+    if age < 12:
+        return 'middle'
+    return 'teen'
+
+async def take(subject, age):
+    """Pop a pooled (question, answer) for this subject and age, or (None, None) on a miss"""
+    key = (subject, age_band(age))
+    row = await db.pool_pop(*key)
+
+    _counts[key] = max(_counts.get(key, 1) - 1, 0) if row else 0
+    if _counts[key] < LOW_WATERMARK:
+        _refill_needed.set()
+
+    if not row:
+        print(f"Question pool miss for {key}")
+        return None, None
+    return row
+
+async def refill(generate_questions):
+    """Top up every pool that fell below the low watermark.
+
+    generate_questions(subject, age, count) returns a list of
+    (question, answer); one call fills up to BATCH_SIZE slots. Questions
+    already pooled for the key or returned by an earlier batch are skipped.
+    """
+    _counts.clear()
+    _counts.update(await db.pool_counts())
+
+    for subject in SUBJECTS:
+        for band, age in AGE_BANDS.items():
+            key = (subject, band)
+            have = _counts.get(key, 0)
+            if have >= LOW_WATERMARK:
+                continue
+
+            known = {answer_checker.normalize(q) for q in await db.pool_questions(subject, band)}
+            fresh = []
+            while len(fresh) < HIGH_WATERMARK - have:
+                wanted = min(BATCH_SIZE, HIGH_WATERMARK - have - len(fresh))
+                batch = await generate_questions(subject, age, wanted)
+                if not batch:
+                    break  # AI is failing; try again on the next round
+                added = 0
+                for question, answer in batch:
+                    text = answer_checker.normalize(question)
+                    if text not in known:
+                        known.add(text)
+                        fresh.append((question, answer))
+                        added += 1
+                if not added:
+                    break  # only repeats; try again on the next round
+
+            if fresh:
+                await db.pool_push(subject, band, fresh)
+                _counts[key] = have + len(fresh)
+                print(f"Question pool {key}: +{len(fresh)} (now {_counts[key]})")
+
+async def refill_loop(generate_questions):
+    """Background task: refill on start, when a pool runs low, and every REFILL_INTERVAL"""
+    while True:
+        _refill_needed.clear()
+        try:
+            await refill(generate_questions)
+        except Exception as e:
+            print(f"Question pool refill error: {e}")
+
+        try:
+            await asyncio.wait_for(_refill_needed.wait(), timeout=REFILL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,98 @@
+"""Which questions each user has already been asked, so nobody gets a repeat.
+
+Two compact structures per user, stored in the seen_questions table:
+
+- a bitset over the offline bank (offline_questions), one bit per line:
+  about 1.4 KB for the whole bank. It is reset if the bank file changes size.
+- a Bloom filter of BLOOM_BYTES for every other question (pool, live AI,
+  math generator), keyed by the normalized text. After BLOOM_CAPACITY
+  questions it starts over, which keeps false positives around 1% and lets
+  a heavy player's oldest questions come back one day.
+
+Both answer "seen?" in O(1) and a user never costs more than a few KB.
+Users are loaded on their first question and kept in an LRU.
+"""
+import hashlib
+import os
+
+import answer_checker
+import db
+import offline_questions
+from cache import LRUCache
+
+BLOOM_BYTES = 2048
+BLOOM_HASHES = 4
+BLOOM_CAPACITY = 1500  # questions before the filter is cleared (~1% false positives)
+CACHE_SIZE = int(os.getenv('SEEN_CACHE_SIZE', '2000'))
+
+_users = LRUCache(CACHE_SIZE, ttl=3600)
+
+def _positions(question):
+    digest = hashlib.sha1(answer_checker.normalize(question).encode()).digest()
+    bits = BLOOM_BYTES * 8
+    return [int.from_bytes(digest[i * 4:i * 4 + 4], 'little') % bits for i in range(BLOOM_HASHES)]
+
+class SeenQuestions:
+    __slots__ = ('bank_size', 'bank', 'bloom', 'bloom_count')
+
+    def __init__(self, bank_size, bank=None, bloom=None, bloom_count=0):
+        self.bank_size = bank_size
+        self.bank = bytearray(bank) if bank else bytearray((bank_size + 7) // 8)
+        self.bloom = bytearray(bloom) if bloom else bytearray(BLOOM_BYTES)
+        self.bloom_count = bloom_count
+
+    # Offline bank lines
+
+    def bank_has(self, index):
+        return self.bank[index >> 3] & (1 << (index & 7)) != 0
+
+    def bank_add(self, index):
+        self.bank[index >> 3] |= 1 << (index & 7)
+
+    def bank_unseen(self, first, last):
+        """Line indexes in [first, last) not asked yet"""
+        return [i for i in range(first, last) if not self.bank_has(i)]
+
+    def bank_clear(self, first, last):
+        for i in range(first, last):
+            self.bank[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    # Any other question, by text
+
+    def has(self, question):
+        return all(self.bloom[p >> 3] & (1 << (p & 7)) for p in _positions(question))
+
+    def add(self, question):
+        if self.bloom_count >= BLOOM_CAPACITY:
+            self.bloom = bytearray(BLOOM_BYTES)
+            self.bloom_count = 0
+        for p in _positions(question):
+            self.bloom[p >> 3] |= 1 << (p & 7)
+        self.bloom_count += 1
+
+async def load(user_id):
+    """The user's SeenQuestions, from the LRU or the database"""
+    seen = _users.get(user_id)
+    if seen is not None:
+        return seen
+
+    bank_size = offline_questions.size()
+    try:
+        row = await db.seen_get(user_id)
+    except Exception as e:
+        print(f"Seen questions read error: {e}")
+        row = None
+    if row is None:
+        seen = SeenQuestions(bank_size)
+    elif row[0] != bank_size:
+        seen = SeenQuestions(bank_size, bloom=row[2], bloom_count=row[3])  # the bank was rebuilt
+    else:
+        seen = SeenQuestions(bank_size, row[1], row[2], row[3])
+    _users.set(user_id, seen)
+    return seen
+
+async def save(user_id, seen):
+    try:
+        await db.seen_put(user_id, seen.bank_size, bytes(seen.bank), bytes(seen.bloom), seen.bloom_count)
+    except Exception as e:
+        print(f"Seen questions write error: {e}")
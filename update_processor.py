@@ -0,0 +1,86 @@
+"""Concurrent update processing that keeps each user's updates in order.
+
+With the default processor the Application handles one update at a time,
+so a kid waiting on the LLM in check_answer holds up every other chat.
+PerUserUpdateProcessor lets up to UPDATE_CONCURRENCY updates run at once
+but takes an asyncio.Lock per effective_user.id around each one: different
+users run in parallel, one user's updates run one after another in arrival
+order (asyncio locks are FIFO), so their conversation steps and wallet
+operations never interleave.
+
+The concurrency slot is taken only once the user's lock is held. The base
+class takes its own semaphore before do_process_update runs, so it gets an
+effectively unlimited bound; otherwise updates queued behind one busy user
+would hold slots while waiting and could stall every other chat.
+
+Locks are reference-counted and dropped as soon as nobody holds or waits
+for them, so the table only ever holds users with updates in flight.
+
+The Application hands every update to the processor as soon as it arrives,
+so the update queue stays near empty under load; the backlog is the
+`pending` count of updates waiting for a lock or a slot.
+"""
+import asyncio
+import os
+import sys
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+import metrics
+
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '64'))
+
+class _UserLock:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # updates holding or waiting for the lock
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, max_concurrent_updates=UPDATE_CONCURRENCY):
+        super().__init__(sys.maxsize)
+        self.limit = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._locks = {}
+        self.pending = 0  # updates waiting for their user's lock or a slot
+        metrics.USERS_IN_FLIGHT.set_function(lambda: len(self._locks))
+        metrics.UPDATES_PENDING.set_function(lambda: self.pending)
+
+    async def do_process_update(self, update, coroutine):
+        user = update.effective_user if isinstance(update, Update) else None
+        self.pending += 1
+        waiting = True
+        if user is None:
+            try:
+                async with self._slots:
+                    self.pending -= 1
+                    waiting = False
+                    await coroutine
+            finally:
+                if waiting:
+                    self.pending -= 1
+            return
+
+        entry = self._locks.get(user.id)
+        if entry is None:
+            entry = self._locks[user.id] = _UserLock()
+        entry.users += 1
+        try:
+            async with entry.lock, self._slots:
+                self.pending -= 1
+                waiting = False
+                await coroutine
+        finally:
+            if waiting:
+                self.pending -= 1  # cancelled while waiting
+            entry.users -= 1
+            if entry.users == 0:
+                del self._locks[user.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
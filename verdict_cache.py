@@ -0,0 +1,82 @@
+"""Cache of LLM answer-check verdicts.
+
+Kids answer the same pooled questions with the same few answers, so a
+verdict the LLM gave once is reused: keyed by the normalized question,
+correct answer and user answer, stored with its cleaned explanation and the
+tokens the call cost. Two tiers: an in-memory LRU in front of the
+verdict_cache table, which survives restarts. Rows expire after TTL and the
+table is trimmed to MAX_ROWS every PRUNE_EVERY stores.
+"""
+import hashlib
+import os
+import time
+from collections import namedtuple
+
+import answer_checker
+import db
+import metrics
+from cache import LRUCache
+
+MEMORY_SIZE = int(os.getenv('VERDICT_CACHE_SIZE', '5000'))
+MEMORY_TTL = 3600  # memory copies are re-read from SQLite after an hour
+TTL = int(os.getenv('VERDICT_CACHE_TTL_DAYS', '30')) * 86400
+MAX_ROWS = int(os.getenv('VERDICT_CACHE_MAX_ROWS', '100000'))
+PRUNE_EVERY = 500
+
+Verdict = namedtuple('Verdict', ['is_correct', 'explanation', 'tokens'])
+
+_memory = LRUCache(MEMORY_SIZE, ttl=MEMORY_TTL)
+_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'tokens_saved': 0}
+_stores = 0
+
+def key(question, correct_answer, user_answer):
+    text = '\x1f'.join(answer_checker.normalize(s) for s in (question, correct_answer, user_answer))
+    return hashlib.sha1(text.encode()).digest()
+
+def _hit(tier, verdict):
+    _stats[f'{tier}_hits'] += 1
+    _stats['tokens_saved'] += verdict.tokens
+    metrics.VERDICT_LOOKUPS.inc(tier)
+    metrics.VERDICT_TOKENS_SAVED.inc(amount=verdict.tokens)
+    return verdict
+
+async def get(question, correct_answer, user_answer):
+    """The cached Verdict for this answer, or None"""
+    k = key(question, correct_answer, user_answer)
+    verdict = _memory.get(k)
+    if verdict is not None:
+        return _hit('memory', verdict)
+
+    try:
+        row = await db.verdict_get(k, time.time() - TTL)
+    except Exception as e:
+        print(f"Verdict cache read error: {e}")
+        row = None
+    if row is not None:
+        verdict = Verdict(bool(row[0]), row[1], row[2])
+        _memory.set(k, verdict)
+        return _hit('db', verdict)
+
+    _stats['misses'] += 1
+    metrics.VERDICT_LOOKUPS.inc('miss')
+    return None
+
+async def put(question, correct_answer, user_answer, verdict):
+    """Remember a Verdict from the LLM in both tiers"""
+    global _stores
+    k = key(question, correct_answer, user_answer)
+    _memory.set(k, verdict)
+    try:
+        await db.verdict_put(k, int(verdict.is_correct), verdict.explanation, verdict.tokens, time.time())
+        _stores += 1
+        if _stores % PRUNE_EVERY == 0:
+            await db.verdict_prune(time.time() - TTL, MAX_ROWS)
+    except Exception as e:
+        print(f"Verdict cache write error: {e}")
+
+def stats():
+    """Hit counters, hit rate and LLM tokens saved"""
+    counts = dict(_stats)
+    lookups = counts['memory_hits'] + counts['db_hits'] + counts['misses']
+    counts['hit_rate'] = (lookups - counts['misses']) / lookups if lookups else 0.0
+    return counts
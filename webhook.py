@@ -0,0 +1,71 @@
+"""Tornado server for webhook mode, with /metrics next to the webhook.
+
+Application.run_webhook owns its HTTP server and offers no way to add
+routes, so in webhook mode bot.py runs the bot through serve() instead:
+the same startup/shutdown sequence as run_webhook, one port serving both
+Telegram's POSTs and the metrics scrape. In polling mode a metrics-only
+server can be started with start_metrics_server().
+"""
+import asyncio
+import json
+import re
+import signal
+
+import tornado.web
+from tornado.httpserver import HTTPServer
+from telegram import Update
+
+import metrics
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header('Content-Type', metrics.CONTENT_TYPE)
+        self.write(metrics.render())
+
+class UpdateHandler(tornado.web.RequestHandler):
+    """Receives Telegram's webhook POSTs and queues them for the Application"""
+
+    def initialize(self, bot_application):
+        self.bot_application = bot_application
+
+    async def post(self):
+        try:
+            data = json.loads(self.request.body)
+        except ValueError:
+            raise tornado.web.HTTPError(400)
+        update = Update.de_json(data, self.bot_application.bot)
+        await self.bot_application.update_queue.put(update)
+
+def make_app(application=None, url_path=None):
+    routes = [(r'/metrics', MetricsHandler)]
+    if application is not None:
+        routes.append((rf'/{re.escape(url_path)}', UpdateHandler, {'bot_application': application}))
+    return tornado.web.Application(routes)
+
+def start_metrics_server(port, listen='0.0.0.0'):
+    """Serve /metrics on its own port from the running event loop; returns the server"""
+    server = HTTPServer(make_app())
+    server.listen(port, listen)
+    return server
+
+async def serve(application, listen, port, url_path, webhook_url):
+    """Run the bot on a webhook until SIGINT or SIGTERM"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    server = HTTPServer(make_app(application, url_path))
+    server.listen(port, listen)
+    try:
+        async with application:
+            if application.post_init:
+                await application.post_init(application)
+            await application.bot.set_webhook(url=webhook_url)
+            await application.start()
+            await stop.wait()
+            await application.stop()
+    finally:
+        server.stop()
+        if application.post_shutdown:
+            await application.post_shutdown(application)